@@ -36,7 +36,7 @@ def isAddonDirectoryIgnored(name):
     return name in {".git", "__pycache__"}
 
 def isAddonFileIgnored(name):
-    extensions = [".src", ".pxd", ".pyx", ".html", ".c", ".cpp", ".h", ".lib", ".a", ".o", ".obj", ".sh", ".bat"]
+    extensions = [".src", ".pxd", ".pyx", ".html", ".c", ".cpp", ".h", ".lib", ".a", ".o", ".obj", ".sh", ".bat", "_setup_info.py"]
     names = {".gitignore", "__setup_info.py"}
     return any(name.endswith(ext) for ext in extensions) or name in names
 
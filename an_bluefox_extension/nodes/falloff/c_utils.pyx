@@ -0,0 +1,153 @@
+from animation_nodes . data_structures cimport CompoundFalloff, Falloff, FloatList
+
+from . fade_memory cimport FadeMemory
+
+# Memory of evaluated falloff strengths, indexed by the position of a point
+# in the evaluated list. Strengths are combined with MAX or MIN while recording.
+
+cdef class StrengthMemory:
+    cdef:
+        FloatList values
+        FloatList recorded
+        bint hasRecorded
+        readonly bint useMax
+
+    def __cinit__(self, bint useMax):
+        self.values = FloatList()
+        self.recorded = FloatList()
+        self.hasRecorded = False
+        self.useMax = useMax
+
+    def getState(self):
+        return self.values.asNumpyArray().copy()
+
+    def setState(self, values):
+        self.values = FloatList.fromNumpyArray(values.astype('float32'))
+
+    def popRecorded(self):
+        # Strengths of the last recording evaluation, they are needed to replay a frame.
+        if not self.hasRecorded:
+            return None
+        self.hasRecorded = False
+        return self.recorded.asNumpyArray().copy()
+
+    cdef void keepRecorded(self, float *current, Py_ssize_t amount):
+        cdef Py_ssize_t i
+        if self.recorded.length != amount:
+            self.recorded = FloatList(length = amount)
+        for i in range(amount):
+            self.recorded.data[i] = current[i]
+        self.hasRecorded = True
+
+    cdef float *getValues(self, Py_ssize_t amount):
+        # A different amount of points starts a new memory.
+        cdef Py_ssize_t i
+        if self.values.length != amount:
+            self.values = FloatList(length = amount)
+            for i in range(amount):
+                self.values.data[i] = 0 if self.useMax else 1
+        return self.values.data
+
+cdef class MemoryFalloff(CompoundFalloff):
+    cdef:
+        Falloff falloff
+        StrengthMemory memory
+        bint record
+
+    def __cinit__(self, Falloff falloff, StrengthMemory memory, bint record):
+        self.falloff = falloff
+        self.memory = memory
+        self.record = record
+
+    cdef list getDependencies(self):
+        return [self.falloff]
+
+    cdef float evaluate(self, float *dependencyResults):
+        # Single points have no index in the memory.
+        return dependencyResults[0]
+
+    cdef void evaluateList(self, float **dependencyResults, Py_ssize_t amount, float *target):
+        cdef Py_ssize_t i
+        cdef float *current = dependencyResults[0]
+        cdef float *values = self.memory.getValues(amount)
+        cdef bint useMax = self.memory.useMax
+        if self.record:
+            self.memory.keepRecorded(current, amount)
+        for i in range(amount):
+            if useMax:
+                target[i] = max(values[i], current[i])
+            else:
+                target[i] = min(values[i], current[i])
+            if self.record:
+                values[i] = target[i]
+
+cdef class FadedMemoryFalloff(CompoundFalloff):
+    cdef:
+        Falloff falloff
+        FadeMemory memory
+        long frame
+        float fadeMin, fadeMax
+        bint record
+
+    def __cinit__(self, Falloff falloff, FadeMemory memory, long frame, float fadeMin, float fadeMax, bint record = True):
+        self.falloff = falloff
+        self.memory = memory
+        self.frame = frame
+        self.fadeMin = fadeMin
+        self.fadeMax = fadeMax
+        self.record = record
+
+    cdef list getDependencies(self):
+        return [self.falloff]
+
+    cdef float evaluate(self, float *dependencyResults):
+        return dependencyResults[0] * self.fadeMax
+
+    cdef void evaluateList(self, float **dependencyResults, Py_ssize_t amount, float *target):
+        cdef float *current = dependencyResults[0]
+        if self.record:
+            self.memory.push(current, amount, self.frame)
+        self.memory.mix(current, amount, self.fadeMin, self.fadeMax, self.record, target)
+
+cdef class WeightedMixFalloff(CompoundFalloff):
+    '''Mixes falloffs with MAX or MIN after multiplying each one with its weight.'''
+    cdef:
+        list falloffs
+        FloatList weights
+        bint useMax
+
+    def __cinit__(self, list falloffs, FloatList weights, bint useMax):
+        assert len(falloffs) == len(weights) > 0
+        self.falloffs = falloffs
+        self.weights = weights
+        self.useMax = useMax
+
+    cdef list getDependencies(self):
+        return self.falloffs
+
+    cdef float evaluate(self, float *dependencyResults):
+        cdef Py_ssize_t k
+        cdef float value, result = self.weights.data[0] * dependencyResults[0]
+        for k in range(1, self.weights.length):
+            value = self.weights.data[k] * dependencyResults[k]
+            if (value > result) == self.useMax: result = value
+        return result
+
+    cdef void evaluateList(self, float **dependencyResults, Py_ssize_t amount, float *target):
+        cdef Py_ssize_t i, k
+        cdef float weight, value
+        cdef float *row
+        for k in range(self.weights.length):
+            weight = self.weights.data[k]
+            row = dependencyResults[k]
+            if k == 0:
+                for i in range(amount):
+                    target[i] = weight * row[i]
+            elif self.useMax:
+                for i in range(amount):
+                    value = weight * row[i]
+                    if value > target[i]: target[i] = value
+            else:
+                for i in range(amount):
+                    value = weight * row[i]
+                    if value < target[i]: target[i] = value
@@ -0,0 +1,12 @@
+cdef class FadeMemory:
+    cdef:
+        float[::1] ring
+        readonly Py_ssize_t slots
+        readonly bint useMax
+        readonly Py_ssize_t amount, head
+        long lastFrame
+        bint hasFrame
+
+    cdef void push(self, float *current, Py_ssize_t amount, long frame)
+    cdef void mix(self, float *current, Py_ssize_t amount, float fadeMin, float fadeMax,
+                  bint pushed, float *target)
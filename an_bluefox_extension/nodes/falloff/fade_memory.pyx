@@ -0,0 +1,67 @@
+from cython.view cimport array
+
+# Fading memory, the last `slots` evaluated strength arrays are kept in a ring
+# buffer and weighted from fadeMin (oldest) to fadeMax (newest) before they are mixed.
+# It doesn't depend on Animation Nodes, so the ring can be tested on its own.
+
+cdef class FadeMemory:
+    def __cinit__(self, Py_ssize_t slots, bint useMax):
+        self.slots = max(slots, 1)
+        self.useMax = useMax
+        self.ring = None
+        self.amount = -1
+        self.head = 0
+        self.hasFrame = False
+
+    def pushValues(self, float[::1] values, long frame):
+        self.push(&values[0], values.shape[0], frame)
+
+    def mixValues(self, float[::1] current, float[::1] target, float fadeMin, float fadeMax, bint pushed):
+        assert current.shape[0] == target.shape[0]
+        self.mix(&current[0], current.shape[0], fadeMin, fadeMax, pushed, &target[0])
+
+    cdef void push(self, float *current, Py_ssize_t amount, long frame):
+        cdef Py_ssize_t i
+        if amount != self.amount:
+            self.ring = array(shape = (max(self.slots * amount, 1),), itemsize = sizeof(float), format = "f")
+            for i in range(self.slots * amount):
+                self.ring[i] = 0 if self.useMax else 1
+            self.amount = amount
+            self.hasFrame = False
+
+        # Evaluating the same frame again replaces the newest strengths.
+        if not self.hasFrame or frame != self.lastFrame:
+            self.head = (self.head + 1) % self.slots
+            self.lastFrame = frame
+            self.hasFrame = True
+
+        cdef float *row = &self.ring[0] + self.head * amount
+        for i in range(amount):
+            row[i] = current[i]
+
+    cdef void mix(self, float *current, Py_ssize_t amount, float fadeMin, float fadeMax,
+                  bint pushed, float *target):
+        # Without a push `current` isn't in the ring, the newest stored row is one frame older then.
+        cdef Py_ssize_t shift = 0 if pushed else 1
+        cdef Py_ssize_t slots = self.slots
+        cdef Py_ssize_t head = self.head
+        cdef Py_ssize_t i, age
+        cdef float weight, value
+        cdef float *row
+
+        for i in range(amount):
+            target[i] = fadeMax * current[i]
+        if self.amount != amount:
+            return
+
+        for age in range(1, slots):
+            weight = fadeMax + (fadeMin - fadeMax) * age / <float>(slots - 1)
+            row = &self.ring[0] + ((head - age + shift + slots) % slots) * amount
+            if self.useMax:
+                for i in range(amount):
+                    value = weight * row[i]
+                    if value > target[i]: target[i] = value
+            else:
+                for i in range(amount):
+                    value = weight * row[i]
+                    if value < target[i]: target[i] = value
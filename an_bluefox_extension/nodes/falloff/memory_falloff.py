@@ -4,14 +4,26 @@ from bpy.props import *
 from animation_nodes . base_types import AnimationNode
 from animation_nodes . nodes . falloff . mix_falloffs import MixFalloffs
 from animation_nodes . nodes . falloff . constant_falloff import ConstantFalloff
+from animation_nodes . data_structures import FloatList
+from ... utils . checkpoints import getCheckpointStore, removeCheckpointStores
+from . c_utils import StrengthMemory, MemoryFalloff, FadedMemoryFalloff, WeightedMixFalloff
+from . fade_memory import FadeMemory
 
 falloffCache = {}
+strengthCache = {}
+fadeCache = {}
+indexCache = {}
 
 mixModeItems = [
     ("MAX", "Max", "", "", 0),
     ("MIN", "Min", "", "", 1)
 ]
 
+storeModeItems = [
+    ("FALLOFFS", "Falloffs", "Keep the falloffs, the history is evaluated at the current positions. Fading costs fade length falloff evaluations per point", "", 0),
+    ("STRENGTHS", "Strengths", "Keep the evaluated strength of every point index, constant cost per frame", "", 1)
+]
+
 class BF_MemoryFalloffNode(bpy.types.Node, AnimationNode):
     bl_idname = "an_bf_MemoryFalloffNode"
     bl_label = "Memory Falloff"
@@ -19,10 +31,16 @@ class BF_MemoryFalloffNode(bpy.types.Node, AnimationNode):
 
     mixMode: EnumProperty(name = "Mix", default = "MAX",
         items = mixModeItems, update = AnimationNode.refresh)
+    storeMode: EnumProperty(name = "Store", default = "FALLOFFS",
+        items = storeModeItems, update = AnimationNode.refresh)
 
     outputFalloffList: BoolProperty(name = "Output Falloff List", default = False,
         update = AnimationNode.refresh)
     enableFade: BoolProperty(name = "Enable Fade", default = False, update = AnimationNode.refresh)
+    checkpointInterval: IntProperty(name = "Checkpoint Interval", default = 10, min = 1,
+        description = "Frames between snapshots of the strengths, scrubbing replays at most this many frames")
+    spillCheckpoints: BoolProperty(name = "Spill To Disk", default = False,
+        description = "Move old snapshots to the temporary directory when they use a lot of memory")
     nodeIndex = 0
 
     def create(self):
@@ -35,27 +53,41 @@ class BF_MemoryFalloffNode(bpy.types.Node, AnimationNode):
             self.newInput("Float", "Fade Min", "fadeMin", value = 0, hide = True)
             self.newInput("Float", "Fade Max", "fadeMax", value = 1, hide = True)
 
-        if self.outputFalloffList:
+        if self.outputFalloffList and self.storeMode == "FALLOFFS":
             self.newOutput("Falloff List", "Falloff", "falloffOut")
         else:
             self.newOutput("Falloff", "Falloff", "falloffOut")
 
     def draw(self, layout):
-        if not self.outputFalloffList:
+        if not self.outputFalloffList or self.storeMode == "STRENGTHS":
             layout.prop(self, "mixMode", text = "")
         layout.prop(self, "enableFade")
 
     def drawAdvanced(self, layout):
-        layout.prop(self, "outputFalloffList")
+        layout.prop(self, "storeMode")
+        if self.storeMode == "FALLOFFS":
+            layout.prop(self, "outputFalloffList")
+            if self.enableFade:
+                # Every faded falloff is evaluated again per point, strengths are stored once.
+                layout.label(text = "Use Strengths to fade many frames", icon = "INFO")
+        elif not self.enableFade:
+            layout.prop(self, "checkpointInterval")
+            layout.prop(self, "spillCheckpoints")
 
     def getExecutionCode(self, required):
         if "falloffOut" in required:
             yield "currentFrame = bpy.context.scene.frame_current"
+            if self.storeMode == "STRENGTHS":
+                if self.enableFade:
+                    yield "falloffOut = self.fadedStrengthMemoryFalloff(falloff, currentFrame, resetFrame, startFrame, length, fadeLength, fadeMin, fadeMax)"
+                else:
+                    yield "falloffOut = self.strengthMemoryFalloff(falloff, currentFrame, resetFrame, startFrame, length)"
+                return
             if self.enableFade:
                 yield "result = self.fadedMemoryFalloff(falloff, currentFrame, resetFrame, startFrame, length, fadeLength, fadeMin, fadeMax)"
             else:
                 yield "result = self.memoryFalloff(falloff, currentFrame, resetFrame, startFrame, length)"
-            if self.outputFalloffList:
+            if self.outputFalloffList or self.enableFade:
                 yield "falloffOut = result"
             else:
                 yield "falloffOut = AN.nodes.falloff.mix_falloffs.MixFalloffs(result, self.mixMode)"
@@ -75,11 +107,42 @@ class BF_MemoryFalloffNode(bpy.types.Node, AnimationNode):
                 falloffCache[identifier] = [self.getDefaultFalloff()] * length
 
             falloffList = falloffCache.get(identifier)
+            # After a backward jump the falloffs of later frames are forgotten.
+            lastIndex = indexCache.get(identifier)
+            if lastIndex is not None and index < lastIndex < length:
+                falloffList[index + 1:lastIndex + 1] = [self.getDefaultFalloff()] * (lastIndex - index)
+            indexCache[identifier] = index
             falloffList[index] = falloff
             return falloffList
         except:
             return [falloff]
 
+    def strengthMemoryFalloff(self, falloff, currentFrame, resetFrame, startFrame, length):
+        useMax = self.mixMode == "MAX"
+        memory = strengthCache.get(self.identifier)
+        store = getCheckpointStore(self.identifier, self.checkpointInterval, self.spillCheckpoints)
+        if memory is None or currentFrame == resetFrame or memory.useMax != useMax:
+            memory = StrengthMemory(useMax)
+            strengthCache[self.identifier] = memory
+            store.clear()
+            store.save(currentFrame - 1, memory.getState(), force = True)
+        else:
+            # The falloff is evaluated after execution, so the strengths of the previous frame are stored now.
+            recorded = memory.popRecorded()
+            if recorded is not None and store.lastFrame is not None:
+                store.record(store.lastFrame, recorded)
+                store.save(store.lastFrame, memory.getState())
+            if not store.isSequential(currentFrame):
+                values = store.rebuild(currentFrame - 1, lambda values, strengths: mixStrengths(values, strengths, useMax))
+                if values is not None:
+                    memory.setState(values)
+        store.lastFrame = currentFrame
+
+        # Like the falloff list, frames after start frame + length - 2 are not remembered.
+        offset = currentFrame - startFrame
+        record = 0 <= offset <= abs(length) - 2
+        return MemoryFalloff(falloff, memory, record)
+
     def fadedMemoryFalloff(self, falloff, currentFrame, resetFrame, startFrame, length, fadeLength, fadeMin, fadeMax):
         try:
             falloffList = self.memoryFalloff(falloff, currentFrame, resetFrame, startFrame, length)
@@ -88,10 +151,25 @@ class BF_MemoryFalloffNode(bpy.types.Node, AnimationNode):
             fadeLength = abs(fadeLength)
             result = shiftedList[-fadeLength:]
             gradient = np.linspace(fadeMin, fadeMax, num=fadeLength, dtype='float32').tolist()
-            result = [MixFalloffs([ConstantFalloff(g), r], 'MULTIPLY') for r,g in zip(result, gradient)]
-            return result
+            if self.outputFalloffList:
+                return [MixFalloffs([ConstantFalloff(g), r], 'MULTIPLY') for r,g in zip(result, gradient)]
+            # Weighting and mixing happen in a single compound falloff.
+            weights = FloatList.fromValues(gradient[:len(result)])
+            return WeightedMixFalloff(result[:len(weights)], weights, self.mixMode == "MAX")
         except:
-            return [falloff]
+            return [falloff] if self.outputFalloffList else falloff
+
+    def fadedStrengthMemoryFalloff(self, falloff, currentFrame, resetFrame, startFrame, length, fadeLength, fadeMin, fadeMax):
+        useMax = self.mixMode == "MAX"
+        slots = max(abs(fadeLength), 1)
+        memory = fadeCache.get(self.identifier)
+        if (memory is None or currentFrame == resetFrame or
+                memory.useMax != useMax or memory.slots != slots):
+            memory = FadeMemory(slots, useMax)
+            fadeCache[self.identifier] = memory
+        offset = currentFrame - startFrame
+        record = 0 <= offset <= abs(length) - 2
+        return FadedMemoryFalloff(falloff, memory, currentFrame, fadeMin, fadeMax, record)
 
     def getDefaultFalloff(self):
         if self.mixMode in ['MAX']:
@@ -104,3 +182,13 @@ class BF_MemoryFalloffNode(bpy.types.Node, AnimationNode):
         for key in keys:
             if key.startswith(self.identifier):
                 falloffCache.pop(key, None)
+        strengthCache.pop(self.identifier, None)
+        fadeCache.pop(self.identifier, None)
+        for key in [key for key in indexCache if key.startswith(self.identifier)]:
+            indexCache.pop(key, None)
+        removeCheckpointStores(self.identifier)
+
+def mixStrengths(values, strengths, useMax):
+    if len(values) != len(strengths):
+        return strengths
+    return np.maximum(values, strengths) if useMax else np.minimum(values, strengths)
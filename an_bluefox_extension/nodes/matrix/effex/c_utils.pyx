@@ -1,6 +1,11 @@
+import cython
 from libc.math cimport sqrt, ceil, floor, abs as absNumber
+from cython.parallel cimport prange
 
-from animation_nodes . math cimport Vector3, setMatrixTranslation, setScaleMatrix, mixVec3, mixQuat, Matrix4, Quaternion
+from animation_nodes . math cimport (
+    Vector3, Euler3, setMatrixTranslation, setScaleMatrix, mixVec3, mixQuat, Matrix4, Quaternion,
+    setTranslationRotationScaleMatrix
+)
 
 from animation_nodes . nodes . matrix . c_utils import*
 
@@ -17,6 +22,9 @@ from .... utils.mix import (
     matrixListLerp, quaternionsToMatrices
 )
 
+from .... utils.trs cimport TRSList
+from .... utils.trs import lerpTRSLists
+
 from animation_nodes . data_structures cimport (
     Vector3DList, DoubleList, FloatList, EulerList, Matrix4x4List,
     QuaternionList, VirtualQuaternionList,
@@ -26,133 +34,127 @@ from animation_nodes . data_structures cimport (
 
 ################################################### Inheritance effex code ###################################################
 
+# Index 0 is the start element, 1...count the spline samples and count + 1 the end element.
+# The samples are indexed in place instead of being copied into a list per element.
+
+cdef inline Vector3 *inheritedPoint(Vector3 *start, Vector3 *spline, Vector3 *end,
+                                    Py_ssize_t count, Py_ssize_t index) nogil:
+    if index <= 0: return start
+    if index > count: return end
+    return spline + (index - 1)
+
+cdef inline Quaternion *inheritedRotation(Quaternion *start, Quaternion *spline, Quaternion *end,
+                                          Py_ssize_t count, Py_ssize_t index) nogil:
+    if index <= 0: return start
+    if index > count: return end
+    return spline + (index - 1)
+
 def inheritPointsOverSpline(Vector3DList vA, Vector3DList vB, Vector3DList splinePoints, FloatList influences):
 
-    cdef Py_ssize_t i, j, bIndex, aIndex, count, splinePointCount, innerLength
+    cdef Py_ssize_t i, bIndex, aIndex, count, splinePointCount, lastIndex
     cdef float f, influence, oneMinusinfluence
+    cdef Vector3 *b
+    cdef Vector3 *a
 
     count = vA.length
     splinePointCount = splinePoints.length
-    innerLength = splinePointCount + 2
+    lastIndex = splinePointCount + 1
 
     cdef Vector3DList outVectorList = Vector3DList(length = count)
-    cdef Vector3DList innerVectorList = Vector3DList(length = innerLength)
 
-    for i in range(count):
-        innerVectorList.data[0] = vA.data[i]
-
-        for j in range(splinePointCount):
-            innerVectorList.data[j+1].x = splinePoints.data[j].x
-            innerVectorList.data[j+1].y = splinePoints.data[j].y
-            innerVectorList.data[j+1].z = splinePoints.data[j].z
-
-        innerVectorList.data[innerLength - 1] = vB.data[i]
-        f = influences.data[i] * (innerLength - 1)
-        influence = f % 1
-        bIndex = int(max(min(floor(f), innerLength - 1), 0))
-        aIndex = int(max(min(ceil(f), innerLength - 1), 0))
-        oneMinusinfluence = 1-influence
-
-        outVectorList.data[i].x = (innerVectorList.data[bIndex].x * oneMinusinfluence
-                                  + innerVectorList.data[aIndex].x * influence)
-        outVectorList.data[i].y = (innerVectorList.data[bIndex].y * oneMinusinfluence
-                                  + innerVectorList.data[aIndex].y * influence)
-        outVectorList.data[i].z = (innerVectorList.data[bIndex].z * oneMinusinfluence
-                                  + innerVectorList.data[aIndex].z * influence)
+    for i in prange(count, nogil = True):
+        f = influences.data[i] * lastIndex
+        influence = f - floor(f)
+        bIndex = <Py_ssize_t>max(min(floor(f), lastIndex), 0)
+        aIndex = <Py_ssize_t>max(min(ceil(f), lastIndex), 0)
+        oneMinusinfluence = 1 - influence
+
+        b = inheritedPoint(vA.data + i, splinePoints.data, vB.data + i, splinePointCount, bIndex)
+        a = inheritedPoint(vA.data + i, splinePoints.data, vB.data + i, splinePointCount, aIndex)
+
+        outVectorList.data[i].x = b.x * oneMinusinfluence + a.x * influence
+        outVectorList.data[i].y = b.y * oneMinusinfluence + a.y * influence
+        outVectorList.data[i].z = b.z * oneMinusinfluence + a.z * influence
 
     return outVectorList
 
 def alignOnSpline(QuaternionList qA, QuaternionList qB,
                   QuaternionList splineRotations, FloatList influences):
+    return quaternionsToEulers(alignRotationsOnSpline(qA, qB, splineRotations, influences))
+
+@cython.cdivision(True)
+def alignRotationsOnSpline(QuaternionList qA, QuaternionList qB,
+                           QuaternionList splineRotations, FloatList influences):
 
-    cdef Py_ssize_t i, j, bIndex, aIndex, count, splineEulerCount, innerLength
+    cdef Py_ssize_t i, bIndex, aIndex, count, splineEulerCount, lastIndex
 
     count = qA.getLength()
     splineEulerCount = splineRotations.getLength()
-    innerLength = splineEulerCount + 2
+    lastIndex = splineEulerCount + 1
 
-    cdef float f, influence, t1, w, x, y, z, ls, invNorm
+    cdef float f, influence, t1, dot, w, x, y, z, norm, invNorm
+    cdef Quaternion *b
+    cdef Quaternion *a
     cdef QuaternionList outEulerlist = QuaternionList(length = count)
-    cdef QuaternionList inList = QuaternionList(length = innerLength)
 
-    for i in range(count):
-        inList.data[0] = qA.data[i]
-
-        for j in range(splineEulerCount):
-            inList.data[j+1].w = splineRotations.data[j].w
-            inList.data[j+1].x = splineRotations.data[j].x
-            inList.data[j+1].y = splineRotations.data[j].y
-            inList.data[j+1].z = splineRotations.data[j].z
-
-        inList.data[innerLength - 1] = qB.data[i]
-        f = influences.data[i] * (innerLength - 1)
-        influence = f % 1
-        bIndex = int(max(min(floor(f), innerLength - 1), 0))
-        aIndex = int(max(min(ceil(f), innerLength - 1), 0))
+    for i in prange(count, nogil = True):
+        f = influences.data[i] * lastIndex
+        influence = f - floor(f)
+        bIndex = <Py_ssize_t>max(min(floor(f), lastIndex), 0)
+        aIndex = <Py_ssize_t>max(min(ceil(f), lastIndex), 0)
         t1 = 1 - influence
-        dot = (inList.data[bIndex].x * inList.data[aIndex].x
-             + inList.data[bIndex].y * inList.data[aIndex].y
-             + inList.data[bIndex].z * inList.data[aIndex].z
-             + inList.data[bIndex].w * inList.data[aIndex].w)
-
-        if dot >= 0:
-            w = t1 * inList.data[bIndex].w + influence * inList.data[aIndex].w
-            x = t1 * inList.data[bIndex].x + influence * inList.data[aIndex].x
-            y = t1 * inList.data[bIndex].y + influence * inList.data[aIndex].y
-            z = t1 * inList.data[bIndex].z + influence * inList.data[aIndex].z
-        else:
-            w = t1 * inList.data[bIndex].w - influence * inList.data[aIndex].w
-            x = t1 * inList.data[bIndex].x - influence * inList.data[aIndex].x
-            y = t1 * inList.data[bIndex].y - influence * inList.data[aIndex].y
-            z = t1 * inList.data[bIndex].z - influence * inList.data[aIndex].z
-
-        ls = w * w + x * x + y * y + z * z
-
-        invNorm = 1/sqrt(ls)
-        w *= invNorm
-        x *= invNorm
-        y *= invNorm
-        z *= invNorm
-
-        outEulerlist.data[i].w = w
-        outEulerlist.data[i].x = x
-        outEulerlist.data[i].y = y
-        outEulerlist.data[i].z = z
-
-    return quaternionsToEulers(outEulerlist)
+
+        b = inheritedRotation(qA.data + i, splineRotations.data, qB.data + i, splineEulerCount, bIndex)
+        a = inheritedRotation(qA.data + i, splineRotations.data, qB.data + i, splineEulerCount, aIndex)
+
+        # Blend along the shorter arc.
+        dot = b.x * a.x + b.y * a.y + b.z * a.z + b.w * a.w
+        if dot < 0:
+            influence = -influence
+
+        w = t1 * b.w + influence * a.w
+        x = t1 * b.x + influence * a.x
+        y = t1 * b.y + influence * a.y
+        z = t1 * b.z + influence * a.z
+
+        # Rotations that cancel out have no direction to normalize, keep b then.
+        norm = w * w + x * x + y * y + z * z
+        if norm < 1e-12:
+            outEulerlist.data[i] = b[0]
+            continue
+        invNorm = 1 / sqrt(norm)
+        outEulerlist.data[i].w = w * invNorm
+        outEulerlist.data[i].x = x * invNorm
+        outEulerlist.data[i].y = y * invNorm
+        outEulerlist.data[i].z = z * invNorm
+
+    return outEulerlist
 
 def inheritMatrixOverSpline(Matrix4x4List mA,
                             Matrix4x4List mB,
                             Vector3DList splinePoints,
                             Matrix4x4List splineRotations, FloatList influences, bint align):
 
-    cdef Vector3DList translation = inheritPointsOverSpline(extractMatrixTranslations(mA),
-                                                extractMatrixTranslations(mB),
-                                                splinePoints,
-                                                influences)
+    # Both lists are decomposed once, the components are blended and composed again.
+    cdef TRSList a = TRSList.fromMatrices(mA)
+    cdef TRSList b = TRSList.fromMatrices(mB)
 
-    cdef EulerList rotation = quaternionsToEulers(quaternionListLerp(
-                                            Matrix4x4List.toQuaternions(mA),
-                                            Matrix4x4List.toQuaternions(mB),
-                                            influences))
+    cdef Vector3DList translation = inheritPointsOverSpline(a.translations, b.translations,
+                                                            splinePoints, influences)
+    cdef QuaternionList rotation
     if align:
-        rotation = alignOnSpline(Matrix4x4List.toQuaternions(mA),
-                                  Matrix4x4List.toQuaternions(mB),
-                                  Matrix4x4List.toQuaternions(splineRotations),
-                                  influences)
+        rotation = alignRotationsOnSpline(a.rotations, b.rotations,
+                                          Matrix4x4List.toQuaternions(splineRotations),
+                                          influences)
+    else:
+        rotation = quaternionListLerp(a.rotations, b.rotations, influences)
 
-    cdef Vector3DList scale = vectorListLerp(extractMatrixScales(mA),
-                                         extractMatrixScales(mB),
-                                         influences)
+    cdef Vector3DList scale = vectorListLerp(a.scales, b.scales, influences)
 
-    cdef VirtualVector3DList _translation = VirtualVector3DList.create(translation, (0, 0, 0))
-    cdef VirtualEulerList _rotation = VirtualEulerList.create(rotation, (0, 0, 0))
-    cdef VirtualVector3DList _scale = VirtualVector3DList.create(scale, (1, 1, 1))
-
-    return composeMatrices(len(mA), _translation, _rotation, _scale)
+    return TRSList(translation, rotation, scale).toMatrices()
 
 def inhertMatrixLinear(Matrix4x4List mA, Matrix4x4List mB, FloatList influences):
-    return matrixListLerp(mA, mB, influences)
+    return lerpTRSLists(TRSList.fromMatrices(mA), TRSList.fromMatrices(mB), influences).toMatrices()
 
 def matrixTranslationLerp(Matrix4x4List matrices, VirtualVector3DList translations, FloatList influences):
     cdef Vector3 target
@@ -189,6 +191,75 @@ def matrixScaleLerp(Matrix4x4List matrices, VirtualVector3DList scales, FloatLis
 
 ################################################# Inheritance effex code end #################################################
 
+################################################### Effex transformation #####################################################
+
+def offsetMatrices(Matrix4x4List matrices, FloatList influences,
+                   VirtualVector3DList translations, VirtualEulerList rotations, VirtualVector3DList scales,
+                   bint useTranslation, bint useRotation, bint useScale):
+    '''Scales on local axes, rotates around global axes with local pivots and
+    translates along global axes in a single pass, the matrices are changed in place.'''
+    cdef Py_ssize_t i
+    for i in range(matrices.length):
+        offsetMatrix(matrices.data + i, influences.data[i],
+                     translations.get(i), rotations.get(i), scales.get(i),
+                     useTranslation, useRotation, useScale)
+    return matrices
+
+def offsetMatricesStack(Matrix4x4List matrices, FloatList influences,
+                        Vector3DList translations, EulerList rotations, Vector3DList scales):
+    '''Applies several effex layers per matrix in one pass. Layer k uses the influences
+    k * len(matrices) ... (k + 1) * len(matrices) and the k-th transformation.'''
+    cdef Py_ssize_t i, k
+    cdef Py_ssize_t amount = matrices.length
+    cdef Py_ssize_t layerAmount = translations.length
+    assert rotations.length == scales.length == layerAmount
+    assert influences.length == amount * layerAmount
+
+    for i in range(amount):
+        for k in range(layerAmount):
+            offsetMatrix(matrices.data + i, influences.data[k * amount + i],
+                         translations.data + k, rotations.data + k, scales.data + k,
+                         True, True, True)
+    return matrices
+
+cdef inline void offsetMatrix(Matrix4 *m, float f, Vector3 *t, Euler3 *r, Vector3 *s,
+                              bint useTranslation, bint useRotation, bint useScale):
+    cdef float sx, sy, sz
+    cdef float b11, b21, b31, b12, b22, b32, b13, b23, b33
+    cdef Euler3 euler
+    cdef Matrix4 rotation
+    cdef Vector3 origin = Vector3(0, 0, 0)
+    cdef Vector3 unitScale = Vector3(1, 1, 1)
+
+    if useScale and (s.x != 1 or s.y != 1 or s.z != 1):
+        sx = 1 + (s.x - 1) * f
+        sy = 1 + (s.y - 1) * f
+        sz = 1 + (s.z - 1) * f
+        m.a11 *= sx; m.a21 *= sx; m.a31 *= sx
+        m.a12 *= sy; m.a22 *= sy; m.a32 *= sy
+        m.a13 *= sz; m.a23 *= sz; m.a33 *= sz
+
+    if useRotation and (r.x != 0 or r.y != 0 or r.z != 0):
+        euler.x, euler.y, euler.z, euler.order = r.x * f, r.y * f, r.z * f, r.order
+        setTranslationRotationScaleMatrix(&rotation, &origin, &euler, &unitScale)
+        b11, b21, b31 = m.a11, m.a21, m.a31
+        b12, b22, b32 = m.a12, m.a22, m.a32
+        b13, b23, b33 = m.a13, m.a23, m.a33
+        m.a11 = rotation.a11 * b11 + rotation.a12 * b21 + rotation.a13 * b31
+        m.a21 = rotation.a21 * b11 + rotation.a22 * b21 + rotation.a23 * b31
+        m.a31 = rotation.a31 * b11 + rotation.a32 * b21 + rotation.a33 * b31
+        m.a12 = rotation.a11 * b12 + rotation.a12 * b22 + rotation.a13 * b32
+        m.a22 = rotation.a21 * b12 + rotation.a22 * b22 + rotation.a23 * b32
+        m.a32 = rotation.a31 * b12 + rotation.a32 * b22 + rotation.a33 * b32
+        m.a13 = rotation.a11 * b13 + rotation.a12 * b23 + rotation.a13 * b33
+        m.a23 = rotation.a21 * b13 + rotation.a22 * b23 + rotation.a23 * b33
+        m.a33 = rotation.a31 * b13 + rotation.a32 * b23 + rotation.a33 * b33
+
+    if useTranslation:
+        m.a14 += t.x * f
+        m.a24 += t.y * f
+        m.a34 += t.z * f
+
 cdef getDirection(Vector3DList vectors, Vector3 *target, Py_ssize_t negFlag = 1):
     cdef Py_ssize_t i
     cdef Py_ssize_t count = vectors.length
@@ -0,0 +1,8 @@
+def getExtensionArgs(Utils):
+    # The loops over points in c_utils.pyx run in parallel with OpenMP.
+    # Apple clang ships without OpenMP, prange runs serially there.
+    if Utils.onWindows:
+        return {"extra_compile_args" : ["/openmp"]}
+    if Utils.onLinux:
+        return {"extra_compile_args" : ["-fopenmp"], "extra_link_args" : ["-fopenmp"]}
+    return {}
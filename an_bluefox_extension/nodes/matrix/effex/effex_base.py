@@ -1,4 +1,6 @@
 from bpy.props import *
+from .... utils . trs import TRSList, offsetTRSList
+from . c_utils import offsetMatrices
 from animation_nodes . nodes . falloff . mix_falloffs import MixFalloffs
 from animation_nodes . nodes . falloff . custom_falloff import CustomFalloff
 from animation_nodes . nodes.matrix.c_utils import (
@@ -14,11 +16,6 @@ from animation_nodes . data_structures import (
 from animation_nodes . nodes.falloff.remap_falloff import RemapInterpolatedFalloff
 from animation_nodes . events import propertyChanged, executionCodeChanged
 from animation_nodes . base_types import AnimationNode, VectorizedSocket
-from animation_nodes . algorithms.matrices import (
-    translateMatrixList,
-    getRotatedMatrixList,
-    scaleMatrixList
-)
 
 mixTypeItems = [
     ("ADD", "Add", "", "NONE", 0),
@@ -48,6 +45,59 @@ class EffexBase:
     useRotationList: VectorizedSocket.newProperty()
     useScaleList: VectorizedSocket.newProperty()
 
+    def componentsVisibilityChanged(self, context):
+        for sockets in (self.inputs, self.outputs):
+            socket = sockets.get("Components")
+            if socket is not None:
+                socket.hide = not self.showComponents
+
+    showComponents: BoolProperty(name = "Show Components", default = False,
+        description = "Show the sockets that pass decomposed matrices to the next effex node",
+        update = componentsVisibilityChanged)
+
+    # Effex nodes linked by their components sockets skip the matrix
+    # decomposition, matrices are composed only for other consumers.
+    def createComponentsInput(self):
+        self.newInput("BF TRS List", "Components", "components", dataIsModified = True,
+            hide = not self.showComponents)
+
+    def createComponentsOutput(self):
+        self.newOutput("BF TRS List", "Components", "components", hide = not self.showComponents)
+
+    def drawComponentsToggle(self, layout):
+        layout.prop(self, "showComponents")
+
+    def componentsLinked(self):
+        # Trees saved before the sockets existed don't have them until a refresh.
+        socket = self.inputs.get("Components")
+        return socket is not None and socket.isLinked
+
+    def usesComponents(self, required):
+        return self.componentsLinked() or "components" in required
+
+    def iterComponentsInputCode(self, required):
+        # The effex code works on `matrices`, which holds the components from here on.
+        if self.componentsLinked():
+            yield "matrices = components"
+        elif "components" in required:
+            yield "matrices = self.toComponents(matrices)"
+
+    def iterComponentsOutputCode(self, required):
+        if self.usesComponents(required):
+            yield "components = matrices"
+            if "matrices" in required:
+                yield "matrices = self.fromComponents(components)"
+
+    def toComponents(self, matrices):
+        # Mirrored or sheared matrices are passed on as matrices.
+        components = TRSList.fromMatrices(matrices, exact = True)
+        return matrices if components is None else components
+
+    def fromComponents(self, components):
+        if isinstance(components, TRSList):
+            return components.toMatrices()
+        return components
+
     def createBasicInputs(self):
         self.newInput("Falloff", "Falloff", "falloff")
         self.newInput(VectorizedSocket("Vector", "useTranslationList",
@@ -86,23 +136,31 @@ class EffexBase:
         row.prop(self, "useScale", text = "Scale", icon = "FULLSCREEN_ENTER")
 
     def offsetMatrixList(self, matrices, influences, translations, rotations, scales):
-        if self.useScale:
-            _scales = VirtualVector3DList.create(scales, (1,1,1))
-            scaleMatrixList(matrices, "LOCAL_AXIS", _scales, influences)
-        if self.useRotation:
-            _rotations = VirtualEulerList.create(rotations, (0,0,0))
-            matrices = getRotatedMatrixList(matrices, "GLOBAL_AXIS__LOCAL_PIVOT", _rotations, influences)
-        if self.useTranslation:
-            _translations = VirtualVector3DList.create(translations, (0,0,0))
-            translateMatrixList(matrices, "GLOBAL_AXIS", _translations, influences)
-        return matrices
+        if isinstance(matrices, TRSList):
+            return offsetTRSList(matrices, influences,
+                VirtualVector3DList.create(translations, (0,0,0)),
+                VirtualEulerList.create(rotations, (0,0,0)),
+                VirtualVector3DList.create(scales, (1,1,1)),
+                self.useTranslation, self.useRotation, self.useScale)
+        # The matrices input is modifiable, all three offsets are applied in one pass in place.
+        return offsetMatrices(matrices, influences,
+            VirtualVector3DList.create(translations, (0,0,0)),
+            VirtualEulerList.create(rotations, (0,0,0)),
+            VirtualVector3DList.create(scales, (1,1,1)),
+            self.useTranslation, self.useRotation, self.useScale)
 
     def getInfluences(self, falloff, matrices):
+        if isinstance(matrices, TRSList):
+            # Falloffs that only need locations are evaluated without composing matrices.
+            try: return falloff.getEvaluator("LOCATION").evaluateList(matrices.translations)
+            except: matrices = matrices.toMatrices()
         try: evaluator = falloff.getEvaluator("TRANSFORMATION_MATRIX")
         except: self.raiseErrorMessage("This falloff cannot be evaluated for matrices")
         return evaluator.evaluateList(matrices)
 
     def getMatriceComponents(self, matrices):
+        if isinstance(matrices, TRSList):
+            return matrices.translations, matrices.getEulers(), matrices.scales
         translations = extractMatrixTranslations(matrices)
         rotations = extractMatrixRotations(matrices)
         scales = extractMatrixScales(matrices)
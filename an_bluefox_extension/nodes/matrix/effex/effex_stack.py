@@ -0,0 +1,169 @@
+import bpy
+import numpy as np
+from bpy.props import *
+from mathutils import Euler
+from . effex_base import mixTypeItems
+from . step_effex import getStepStrengths
+from . time_effex import getTimeStrengths
+from . c_utils import offsetMatricesStack
+from .... utils . formula import evaluateFormula
+from animation_nodes . base_types import AnimationNode
+from animation_nodes . nodes . falloff . mix_falloffs import MixFalloffs
+from animation_nodes . nodes . falloff . custom_falloff import CustomFalloff
+from animation_nodes . nodes . falloff . remap_falloff import RemapInterpolatedFalloff
+from animation_nodes . nodes . matrix . c_utils import extractMatrixTranslations
+from animation_nodes . data_structures import FloatList, Vector3DList, EulerList
+
+sourceItems = [
+    ("STEP", "Step", "Strengths increase in steps over the matrix indices", "", 0),
+    ("TIME", "Time", "Strengths increase with time", "", 1),
+    ("FORMULA", "Formula", "Strengths from a formula, px, py and pz are the locations", "", 2),
+    ("FALLOFF", "Falloff", "Only the falloff is used", "", 3)
+]
+
+def layerChanged(self, context):
+    path = self.path_from_id()
+    node = self.id_data.path_resolve(path[:path.rfind(".layers")])
+    node.refresh()
+
+class BF_EffexLayer(bpy.types.PropertyGroup):
+    name: StringProperty(name = "Name", default = "Effex", update = layerChanged)
+    source: EnumProperty(name = "Source", default = "STEP", items = sourceItems, update = layerChanged)
+    mixType: EnumProperty(name = "Mix Type", items = mixTypeItems, default = "MULTIPLY",
+        description = "falloff and effex mix method")
+    formula: StringProperty(name = "Formula", default = "sin(id/count*2*pi + frame/10)")
+    infinite: BoolProperty(name = "Infinite", default = False,
+        description = "Don't clamp the time strengths to 0...1")
+    useTranslation: BoolProperty(name = "Use Translation", default = True, update = layerChanged)
+    useRotation: BoolProperty(name = "Use Rotation", default = False, update = layerChanged)
+    useScale: BoolProperty(name = "Use Scale", default = False, update = layerChanged)
+
+class BF_EffexStackNode(bpy.types.Node, AnimationNode):
+    '''Applies the layers in order. Unlike chained effex nodes, all falloffs are
+    evaluated for the input matrices and every matrix is changed only once.'''
+    bl_idname = "an_bf_EffexStackNode"
+    bl_label = "Effex Stack"
+    bl_width_default = 220
+    errorHandlingType = "EXCEPTION"
+
+    layers: CollectionProperty(type = BF_EffexLayer)
+
+    def setup(self):
+        self.layers.add()
+
+    def create(self):
+        self.newInput("Matrix List", "Matrices", "matrices", dataIsModified = True)
+        for i, layer in enumerate(self.layers):
+            for dataType, name, identifier, kwargs in getLayerSockets(layer, i):
+                self.newInput(dataType, f"{layer.name} {name}", identifier, **kwargs)
+        self.newOutput("Matrix List", "Matrices", "matrices")
+
+    def draw(self, layout):
+        col = layout.column(align = True)
+        for i, layer in enumerate(self.layers):
+            box = col.box()
+            row = box.row(align = True)
+            row.prop(layer, "name", text = "")
+            row.prop(layer, "source", text = "")
+            self.invokeFunction(row, "moveLayer", icon = "TRIA_UP", data = f"{i},-1")
+            self.invokeFunction(row, "removeLayer", icon = "X", data = str(i))
+            row = box.row(align = True)
+            row.prop(layer, "useTranslation", text = "Loc", icon = "EXPORT")
+            row.prop(layer, "useRotation", text = "Rot", icon = "FILE_REFRESH")
+            row.prop(layer, "useScale", text = "Scale", icon = "FULLSCREEN_ENTER")
+            row = box.row(align = True)
+            row.prop(layer, "mixType", text = "")
+            if layer.source == "FORMULA":
+                box.prop(layer, "formula", text = "")
+            elif layer.source == "TIME":
+                row.prop(layer, "infinite")
+        self.invokeFunction(col, "addLayer", text = "Add Layer", icon = "ADD")
+
+    def addLayer(self):
+        layer = self.layers.add()
+        layer.name = f"Effex {len(self.layers)}"
+        self.refresh()
+
+    def removeLayer(self, index):
+        self.layers.remove(int(index))
+        self.refresh()
+
+    def moveLayer(self, data):
+        index, offset = map(int, data.split(","))
+        if 0 <= index + offset < len(self.layers):
+            self.layers.move(index, index + offset)
+            self.refresh()
+
+    def execute(self, matrices, *layerInputs):
+        amount = len(matrices)
+        if amount == 0 or len(self.layers) == 0:
+            return matrices
+
+        translations, rotations, scales = [], [], []
+        influences = np.empty((len(self.layers), amount), dtype = "float32")
+        locations = None
+
+        # All influences are computed before the matrices change.
+        inputs = iter(layerInputs)
+        for k, layer in enumerate(self.layers):
+            values = {identifier.split("_")[0]: next(inputs)
+                      for _, _, identifier, _ in getLayerSockets(layer, k)}
+            if layer.source == "FORMULA" and locations is None:
+                locations = extractMatrixTranslations(matrices).asNumpyArray().reshape(-1, 3)
+
+            strengths = self.getLayerStrengths(layer, values, amount, locations)
+            falloff = CustomFalloff(strengths, 0)
+            if layer.mixType != "NONE":
+                falloff = MixFalloffs([values["falloff"], falloff], layer.mixType, default = 1)
+            if layer.source != "FALLOFF":
+                # Same remap as the single effex nodes.
+                falloff = RemapInterpolatedFalloff(falloff, 0, 1, values["minValue"], values["maxValue"],
+                                                   values["interpolation"])
+            try: evaluator = falloff.getEvaluator("TRANSFORMATION_MATRIX")
+            except: self.raiseErrorMessage(f"{layer.name}: falloff cannot be evaluated for matrices")
+            influences[k] = evaluator.evaluateList(matrices).asNumpyArray()
+
+            translations.append(values.get("translation", (0, 0, 0)))
+            rotations.append(values.get("rotation", Euler((0, 0, 0))))
+            scales.append(values.get("scale", (1, 1, 1)))
+
+        return offsetMatricesStack(matrices, FloatList.fromNumpyArray(influences.ravel()),
+            Vector3DList.fromValues(translations), EulerList.fromValues(rotations),
+            Vector3DList.fromValues(scales))
+
+    def getLayerStrengths(self, layer, values, amount, locations):
+        if layer.source == "STEP":
+            return getStepStrengths(amount, values["step"])
+        if layer.source == "TIME":
+            return getTimeStrengths(values["time"], layer.infinite, values["duration"],
+                                    values["speed"], amount)
+        if layer.source == "FORMULA":
+            variables = {"px": locations[:, 0], "py": locations[:, 1], "pz": locations[:, 2]}
+            try:
+                array = evaluateFormula(layer.formula, count = amount, vars = variables)
+            except Exception as e:
+                self.raiseErrorMessage(f"{layer.name}: formula error! {e}")
+            array = np.broadcast_to(np.asarray(array, dtype = "float32"), (amount,))
+            return FloatList.fromNumpyArray(np.ascontiguousarray(array))
+        return FloatList.fromNumpyArray(np.ones(amount, dtype = "float32"))
+
+def getLayerSockets(layer, index):
+    sockets = [("Falloff", "Falloff", f"falloff_{index}", {})]
+    if layer.source == "STEP":
+        sockets.append(("Float", "Step", f"step_{index}", dict(minValue = 0)))
+    elif layer.source == "TIME":
+        sockets.append(("Float", "Time", f"time_{index}", {}))
+        sockets.append(("Float", "Duration", f"duration_{index}", dict(value = 20)))
+        sockets.append(("Float", "Speed", f"speed_{index}", dict(value = 1)))
+    if layer.source != "FALLOFF":
+        sockets.append(("Float", "Min", f"minValue_{index}", dict(value = 0, hide = True)))
+        sockets.append(("Float", "Max", f"maxValue_{index}", dict(value = 1, hide = True)))
+        sockets.append(("Interpolation", "Interpolation", f"interpolation_{index}",
+                        dict(defaultDrawType = "PROPERTY_ONLY")))
+    if layer.useTranslation:
+        sockets.append(("Vector", "Translation", f"translation_{index}", {}))
+    if layer.useRotation:
+        sockets.append(("Euler", "Rotation", f"rotation_{index}", {}))
+    if layer.useScale:
+        sockets.append(("Vector", "Scale", f"scale_{index}", dict(value = (1, 1, 1))))
+    return sockets
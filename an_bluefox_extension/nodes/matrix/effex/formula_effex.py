@@ -26,10 +26,12 @@ class BF_FormulaEffexNode(bpy.types.Node, AnimationNode, EffexBase):
 
     def create(self):
         self.newInput("Matrix List", "Matrices", "matrices", dataIsModified = True)
+        self.createComponentsInput()
         self.newInput("Struct", "Variables", "variables")
         self.createBasicInputs()
         self.newOutput("Matrix List", "Matrices", "matrices")
         self.newOutput("Float List", "Values", "effexValues", hide = True)
+        self.createComponentsOutput()
         self.updateSocketVisibility()
 
     def draw(self, layout):
@@ -39,6 +41,7 @@ class BF_FormulaEffexNode(bpy.types.Node, AnimationNode, EffexBase):
 
     def drawAdvanced(self, layout):
         self.drawFalloffMixType(layout)
+        self.drawComponentsToggle(layout)
         layout.prop(self, "incPosAttr")
         layout.label(text = "px,py,pz")
         layout.prop(self, "incRotAttr")
@@ -49,8 +52,9 @@ class BF_FormulaEffexNode(bpy.types.Node, AnimationNode, EffexBase):
         layout.label(text = "falloff")
 
     def getExecutionCode(self, required):
-        if "matrices" in required or "effexValues" in required:
+        if "matrices" in required or "effexValues" in required or "components" in required:
             yield "effexValues = AN.data_structures.DoubleList()"
+            yield from self.iterComponentsInputCode(required)
             if any([self.useTranslation, self.useRotation, self.useScale]):
                 yield "efStrengths = AN.data_structures.FloatList()"
                 yield "try:"
@@ -62,6 +66,7 @@ class BF_FormulaEffexNode(bpy.types.Node, AnimationNode, EffexBase):
                     yield "    effexValues = AN.data_structures.DoubleList.fromValues(influences)"
                 yield "except Exception as e:"
                 yield "    self.setErrorMessage(f'Formula error! {str(e)}')"
+            yield from self.iterComponentsOutputCode(required)
 
     def getFormulaStrengths(self, matrices, falloff, userInputs):
         formula = self.formula
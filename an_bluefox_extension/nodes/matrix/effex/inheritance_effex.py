@@ -1,5 +1,7 @@
 import bpy
+import hashlib
 from bpy.props import *
+from collections import OrderedDict
 from mathutils import Matrix
 from . effex_base import EffexBase
 from animation_nodes . events import propertyChanged
@@ -31,6 +33,13 @@ selectModeItems = [
     ("SPLINE", "Spline", "Along Curve", "", 1)
 ]
 
+# Sampled spline points and rotations of recent executions, keyed by the node,
+# the spline content and the sampling parameters. A static guide spline is sampled once.
+splineSampleCache = OrderedDict()
+splineSampleCacheSize = 16
+# Hit and miss counts keyed by node identifier.
+splineSampleStats = {}
+
 dataModeItems = [
     ("MATRIX_COMPONENTS", "Matrices & Components", "", "", 0),
     ("MATRIX_MATRIX", "Matrices & Matrices", "", "", 1),
@@ -120,6 +129,10 @@ class BF_InheritanceEffexNode(bpy.types.Node, AnimationNode, EffexBase, SplineEv
         layout.prop(self, "dataMode", text = "")
         if self.selectMode == "SPLINE":
             layout.prop(self, "resolution")
+            stats = splineSampleStats.get(self.identifier, {})
+            hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+            if hits + misses:
+                layout.label(text = f"Spline cache: {hits / (hits + misses):.0%} hits ({hits}/{hits + misses})")
 
     def getExecutionCode(self, required):
         if self.dataMode in ['MATRIX_COMPONENTS', 'MATRIX_MATRIX']:
@@ -237,6 +250,22 @@ class BF_InheritanceEffexNode(bpy.types.Node, AnimationNode, EffexBase, SplineEv
             return vectors1
 
     def evalSpline(self, spline, samples):
+        key = (self.identifier, hashSpline(spline), samples, self.resolution, self.trackAxis, self.guideAxis)
+        stats = splineSampleStats.setdefault(self.identifier, {"hits": 0, "misses": 0})
+        result = splineSampleCache.get(key)
+        if result is not None:
+            stats["hits"] += 1
+            splineSampleCache.move_to_end(key)
+            return result
+
+        stats["misses"] += 1
+        result = self.sampleSpline(spline, samples)
+        splineSampleCache[key] = result
+        if len(splineSampleCache) > splineSampleCacheSize:
+            splineSampleCache.popitem(last = False)
+        return result
+
+    def sampleSpline(self, spline, samples):
         spline.ensureUniformConverter(self.resolution)
         spline.ensureNormals()
         evalRange = range_DoubleList_StartStep(samples, 0, 1/samples)
@@ -249,3 +278,26 @@ class BF_InheritanceEffexNode(bpy.types.Node, AnimationNode, EffexBase, SplineEv
 
         rotationMatrices = directionsToMatrices(tangents, normals, self.trackAxis, self.guideAxis)
         return locations, rotationMatrices
+
+    def delete(self):
+        clearSplineSamples(self.identifier)
+
+def clearSplineSamples(identifier = None):
+    for key in [key for key in splineSampleCache if identifier is None or key[0] == identifier]:
+        splineSampleCache.pop(key)
+    if identifier is None:
+        splineSampleStats.clear()
+    else:
+        splineSampleStats.pop(identifier, None)
+
+def unregister():
+    clearSplineSamples()
+
+def hashSpline(spline):
+    digest = hashlib.blake2b(digest_size = 16)
+    digest.update(f"{spline.type} {spline.cyclic}".encode())
+    for name in ("points", "leftHandles", "rightHandles", "radii", "tilts"):
+        values = getattr(spline, name, None)
+        if values is not None:
+            digest.update(values.asMemoryView())
+    return digest.digest()
@@ -13,10 +13,12 @@ class BF_StepEffexNode(bpy.types.Node, AnimationNode, EffexBase):
 
     def create(self):
         self.newInput("Matrix List", "Matrices", "matrices", dataIsModified = True)
+        self.createComponentsInput()
         self.newInput("Float", "Step", "step", minValue = 0)
         self.createBasicInputs()
         self.newOutput("Matrix List", "Matrices", "matrices")
         self.newOutput("Float List", "Values", "effexValues", hide = True)
+        self.createComponentsOutput()
         self.updateSocketVisibility()
 
     def draw(self, layout):
@@ -24,10 +26,12 @@ class BF_StepEffexNode(bpy.types.Node, AnimationNode, EffexBase):
 
     def drawAdvanced(self, layout):
         self.drawFalloffMixType(layout)
+        self.drawComponentsToggle(layout)
 
     def getExecutionCode(self, required):
-        if "matrices" in required or "effexValues" in required:
+        if "matrices" in required or "effexValues" in required or "components" in required:
             yield "effexValues = AN.data_structures.DoubleList()"
+            yield from self.iterComponentsInputCode(required)
             if any([self.useTranslation, self.useRotation, self.useScale]):
                 yield "efStrengths = self.getStepStrengths(len(matrices), step)"
                 yield "mixedFalloff = self.mixEffexAndFalloff(efStrengths, falloff, interpolation, outMin=minValue, outMax=maxValue)"
@@ -35,11 +39,15 @@ class BF_StepEffexNode(bpy.types.Node, AnimationNode, EffexBase):
                 yield "matrices = self.offsetMatrixList(matrices, influences, translation, rotation, scale)"
                 if "effexValues" in required:
                     yield "effexValues = AN.data_structures.DoubleList.fromValues(influences)"
+            yield from self.iterComponentsOutputCode(required)
 
     def getStepStrengths(self, amount, step):
-        amount = max(1, amount)
-        array = np.linspace(0, 1, num=amount, endpoint=False, dtype=np.float32)
-        if step > 0:
-            array = np.floor(array * step) / step
-        strengths = FloatList.fromNumpyArray(array)
-        return strengths
+        return getStepStrengths(amount, step)
+
+def getStepStrengths(amount, step):
+    amount = max(1, amount)
+    array = np.linspace(0, 1, num=amount, endpoint=False, dtype=np.float32)
+    if step > 0:
+        array = np.floor(array * step) / step
+    strengths = FloatList.fromNumpyArray(array)
+    return strengths
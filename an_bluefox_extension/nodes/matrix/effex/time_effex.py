@@ -17,6 +17,7 @@ class BF_TimeEffexNode(bpy.types.Node, AnimationNode, EffexBase):
 
     def create(self):
         self.newInput("Matrix List", "Matrices", "matrices", dataIsModified = True)
+        self.createComponentsInput()
         self.newInput("Float", "Time", "time")
         self.newInput(VectorizedSocket("Boolean", "useInfiniteList",
             ("Infinite", "infinites"),
@@ -30,6 +31,7 @@ class BF_TimeEffexNode(bpy.types.Node, AnimationNode, EffexBase):
         self.createBasicInputs()
         self.newOutput("Matrix List", "Matrices", "matrices")
         self.newOutput("Float List", "Values", "effexValues", hide = True)
+        self.createComponentsOutput()
         self.updateSocketVisibility()
 
     def draw(self, layout):
@@ -37,10 +39,12 @@ class BF_TimeEffexNode(bpy.types.Node, AnimationNode, EffexBase):
 
     def drawAdvanced(self, layout):
         self.drawFalloffMixType(layout)
+        self.drawComponentsToggle(layout)
 
     def getExecutionCode(self, required):
-        if "matrices" in required or "effexValues" in required:
+        if "matrices" in required or "effexValues" in required or "components" in required:
             yield "effexValues = AN.data_structures.DoubleList()"
+            yield from self.iterComponentsInputCode(required)
             if any([self.useTranslation, self.useRotation, self.useScale]):
                 yield "efStrengths = self.getTimeStrengths(time, infinites, durations, speeds, len(matrices))"
                 yield "mixedFalloff = self.mixEffexAndFalloff(efStrengths, falloff, interpolation, outMin=minValue, outMax=maxValue)"
@@ -48,16 +52,20 @@ class BF_TimeEffexNode(bpy.types.Node, AnimationNode, EffexBase):
                 yield "matrices = self.offsetMatrixList(matrices, influences, translation, rotation, scale)"
                 if "effexValues" in required:
                     yield "effexValues = AN.data_structures.DoubleList.fromValues(influences)"
+            yield from self.iterComponentsOutputCode(required)
 
     def getTimeStrengths(self, time, infinites, durations, speeds, amount):
-        amount = max(1, amount)
-        _durations = VirtualDoubleList.create(durations, 0).materialize(amount)
-        _speeds = VirtualDoubleList.create(speeds, 0).materialize(amount)
-        _infinites = VirtualBooleanList.create(infinites, 0).materialize(amount)
+        return getTimeStrengths(time, infinites, durations, speeds, amount)
 
-        array = time / _durations.asNumpyArray() * _speeds.asNumpyArray()
-        mask = _infinites.asNumpyArray() == b''
-        array[mask] = np.clip(array[mask], 0, 1)
+def getTimeStrengths(time, infinites, durations, speeds, amount):
+    amount = max(1, amount)
+    _durations = VirtualDoubleList.create(durations, 0).materialize(amount)
+    _speeds = VirtualDoubleList.create(speeds, 0).materialize(amount)
+    _infinites = VirtualBooleanList.create(infinites, 0).materialize(amount)
 
-        strengths = FloatList.fromNumpyArray(array.astype('f'))
-        return strengths
+    array = time / _durations.asNumpyArray() * _speeds.asNumpyArray()
+    mask = _infinites.asNumpyArray() == b''
+    array[mask] = np.clip(array[mask], 0, 1)
+
+    strengths = FloatList.fromNumpyArray(array.astype('f'))
+    return strengths
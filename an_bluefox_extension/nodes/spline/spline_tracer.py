@@ -1,6 +1,9 @@
 import bpy
+import numpy as np
 from bpy.props import *
-from animation_nodes . data_structures import PolySpline
+from mathutils import Vector
+from ... utils . checkpoints import getCheckpointStore, removeCheckpointStores
+from animation_nodes . data_structures import PolySpline, Vector3DList, FloatList
 from animation_nodes . base_types import AnimationNode, VectorizedSocket
 
 class BF_SplineTracerNode(bpy.types.Node, AnimationNode):
@@ -13,6 +16,11 @@ class BF_SplineTracerNode(bpy.types.Node, AnimationNode):
     for attr in ["Vector","StartFrame","EndFrame","Radius","Tilt","MinDistance"]:
         exec("use{}List: VectorizedSocket.newProperty()".format(attr), globals(), locals())
 
+    checkpointInterval: IntProperty(name = "Checkpoint Interval", default = 10, min = 1,
+        description = "Frames between snapshots of the traced splines, scrubbing replays at most this many frames")
+    spillCheckpoints: BoolProperty(name = "Spill To Disk", default = False,
+        description = "Move old snapshots to the temporary directory when they use a lot of memory")
+
     nodeIndex = 0
     nodeCache = {}
 
@@ -49,6 +57,10 @@ class BF_SplineTracerNode(bpy.types.Node, AnimationNode):
         self.newOutput(VectorizedSocket("Spline", listCollection,
             ("Spline", "spline"), ("Splines", "spline")))
 
+    def drawAdvanced(self, layout):
+        layout.prop(self, "checkpointInterval")
+        layout.prop(self, "spillCheckpoints")
+
     def execute(self, point, startFrame, endFrame, radius, tilt, minDistance, reset, scene):
         self.nodeIndex += 1
 
@@ -65,19 +77,43 @@ class BF_SplineTracerNode(bpy.types.Node, AnimationNode):
         if (currentFrame == startFrame) or reset:
             self.clearCache()
 
+        store = getCheckpointStore(identifier, self.checkpointInterval, self.spillCheckpoints)
         spline = self.nodeCache.get(identifier)
 
+        if spline is not None and currentFrame == store.lastFrame:
+            return spline.copy()
+
+        if spline is not None and not store.isSequential(currentFrame):
+            # Scrubbed, continue from the state of the previous frame.
+            spline = store.rebuild(currentFrame - 1, self.traceStep, lambda state: splineFromState(store, state))
+            self.nodeCache[identifier] = spline
+
         if spline is None:
+            # Nothing to continue from, start again as on the start frame.
             spline = PolySpline()
             self.nodeCache[identifier] = spline
+            store.clear()
+            store.save(currentFrame, getSplineState(spline, store, currentFrame), force = True)
+            store.lastFrame = currentFrame
             return spline
 
         if currentFrame > startFrame and currentFrame <= endFrame:
-            if self.checkAppendDistance(point, spline, minDistance):
-                spline.appendPoint(point, radius, tilt)
+            inputs = (tuple(point), radius, tilt, minDistance)
+            store.record(currentFrame, inputs)
+            spline = self.traceStep(spline, inputs)
 
+        store.lastFrame = currentFrame
+        if store.isCheckpointFrame(currentFrame):
+            store.save(currentFrame, getSplineState(spline, store, currentFrame))
         return spline.copy()
 
+    def traceStep(self, spline, inputs):
+        point, radius, tilt, minDistance = inputs
+        point = Vector(point)
+        if self.checkAppendDistance(point, spline, minDistance):
+            spline.appendPoint(point, radius, tilt)
+        return spline
+
     def checkAppendDistance(self, point, spline, minDistance):
         if len(spline.points):
             pointDistance = (spline.points[-1] - point).length
@@ -89,6 +125,32 @@ class BF_SplineTracerNode(bpy.types.Node, AnimationNode):
         for key in keys:
             if key.startswith(self.identifier):
                 self.nodeCache.pop(key, None)
+        removeCheckpointStores(self.identifier)
 
     def delete(self):
         self.clearCache()
+
+def getSplineState(spline, store, frame):
+    '''Splines only grow until they are reset, so a snapshot keeps only the points
+    appended since the previous snapshot, the memory of all snapshots is O(points).
+    A snapshot is (previous snapshot frame, point count, last point, points, radii, tilts).'''
+    points = spline.points.asNumpyArray().reshape(-1, 3)
+    radii, tilts = spline.radii.asNumpyArray(), spline.tilts.asNumpyArray()
+    base, start = None, 0
+    earlier = [k for k in store.checkpoints if k < frame]
+    if earlier:
+        _, length, last = store.getEntry(store.checkpoints, max(earlier))[:3]
+        # The previous snapshot is only used if it is the start of this spline.
+        if length == 0 or (length <= len(points) and np.array_equal(points[length - 1], last)):
+            base, start = max(earlier), length
+    last = points[-1].copy() if len(points) else None
+    return (base, len(points), last, points[start:], radii[start:], tilts[start:])
+
+def splineFromState(store, state):
+    parts = [state[3:]]
+    while state[0] is not None:
+        state = store.getEntry(store.checkpoints, state[0])
+        parts.append(state[3:])
+    points, radii, tilts = (np.concatenate(arrays) for arrays in zip(*reversed(parts)))
+    return PolySpline(Vector3DList.fromNumpyArray(points.ravel()), FloatList.fromNumpyArray(radii),
+                      FloatList.fromNumpyArray(tilts))
@@ -0,0 +1,81 @@
+import os
+import bpy
+import numpy as np
+from bpy.props import *
+from ... utils import save_to_disk as sd
+from animation_nodes . data_structures import Vector3DList
+from animation_nodes . base_types import AnimationNode
+
+modeItems = [
+    ("VELOCITY", "Velocity", "Change of the positions per frame", "", 0),
+    ("ACCELERATION", "Acceleration", "Change of the velocities per frame", "", 1)
+]
+
+class BF_CacheVelocityNode(bpy.types.Node, AnimationNode):
+    bl_idname = "an_bf_CacheVelocityNode"
+    bl_label = "Cache Velocity"
+    bl_width_default = 150
+    errorHandlingType = "EXCEPTION"
+
+    mode: EnumProperty(name="Mode", default="VELOCITY", items=modeItems, update=AnimationNode.refresh)
+    perSecond: BoolProperty(name="Per Second", description="Scale by the scene frame rate instead of per frame", default=False)
+
+    def create(self):
+        self.newInput("Text", "File Path", "filePath",
+            value="/tmp/an_cache.npy",
+            showFileChooser = True,
+            defaultDrawType = "PROPERTY_ONLY")
+        self.newInput("Integer", "Frame", "frame", value=1)
+        name = "Velocities" if self.mode == "VELOCITY" else "Accelerations"
+        self.newOutput("Vector List", name, "vectors")
+
+    def draw(self, layout):
+        row = layout.row(align=True)
+        row.prop(self, "mode", text="")
+        row.prop(self, "perSecond", text="", icon="TIME")
+
+    def execute(self, filePath, frame):
+        try:
+            if not os.path.exists(filePath):
+                self.raiseErrorMessage("File does not exist")
+
+            reader = sd.getReader(filePath)
+            if reader.classType not in ("VECTOR", "MESH"):
+                self.raiseErrorMessage(f"{reader.classType} cache has no positions")
+
+            index = min(max(frame - reader.startFrame, 0), reader.n - 1)
+            order = 1 if self.mode == "VELOCITY" else 2
+            vectors = getDerivative(reader, index, order)
+            if self.perSecond:
+                render = bpy.context.scene.render
+                vectors *= (render.fps / render.fps_base) ** order
+            return Vector3DList.fromNumpyArray(vectors.astype('float32').ravel())
+
+        except Exception as e:
+            self.raiseErrorMessage("ERROR: " + str(e))
+            return Vector3DList()
+
+def getDerivative(reader, i, order):
+    # Differences are taken over the block of frames around i at once,
+    # only neighbouring frames with as many points as frame i are used.
+    first = max(i - order, 0)
+    block, lengths = reader.readRange(first, i + order + 1)
+    k = i - first
+    length = lengths[k]
+    same = lengths == length
+    low, high = k, k
+    while low > 0 and same[low - 1]:
+        low -= 1
+    while high < len(same) - 1 and same[high + 1]:
+        high += 1
+    if high - low < order:
+        return np.zeros((length, 3), 'float64')
+
+    positions = np.asarray(block[low:high + 1, 0:length], 'float64')
+    j = k - low
+    if order == 1:
+        return np.gradient(positions, axis=0)[j]
+    # Second difference x[j + 1] - 2x[j] + x[j - 1], at the ends of the
+    # block the same stencil is taken one frame inwards (one-sided).
+    j = min(max(j, 1), len(positions) - 2)
+    return positions[j + 1] - 2 * positions[j] + positions[j - 1]
@@ -0,0 +1,70 @@
+import os
+import bpy
+from math import floor
+from bpy.props import *
+from ... utils import save_to_disk as sd
+from . channel_cache_writer import BF_CacheChannel
+from animation_nodes . base_types import AnimationNode
+
+class BF_ChannelCacheReaderNode(bpy.types.Node, AnimationNode):
+    bl_idname = "an_bf_ChannelCacheReaderNode"
+    bl_label = "Channel Cache Reader"
+    bl_width_default = 160
+    errorHandlingType = "EXCEPTION"
+
+    channels: CollectionProperty(type=BF_CacheChannel)
+
+    def create(self):
+        self.newInput("Text", "File Path", "filePath",
+            value="/tmp/an_channels.npy",
+            showFileChooser = True,
+            defaultDrawType = "PROPERTY_ONLY")
+        self.newInput("Float", "Frame", "frame", value=1)
+        for i, channel in enumerate(self.channels):
+            self.newOutput(channel.classType.title() + " List", channel.name, f"channel_{i}")
+
+    def draw(self, layout):
+        self.invokeFunction(layout, "loadChannels", description="Create an output for every channel of the cache",
+            text="Load Channels", icon="FILE_REFRESH")
+
+    def loadChannels(self):
+        filePath = self.inputs["File Path"].value
+        if not os.path.exists(filePath):
+            return
+        reader = sd.getReader(filePath)
+        if reader.classType != "CHANNELS":
+            return
+        self.channels.clear()
+        for name, (_, classType) in reader.channels.items():
+            channel = self.channels.add()
+            channel.name = name
+            channel.classType = classType
+        self.refresh()
+
+    def execute(self, filePath, frame):
+        try:
+            if not os.path.exists(filePath):
+                self.raiseErrorMessage("File does not exist")
+
+            reader = sd.getReader(filePath)
+            if reader.classType != "CHANNELS":
+                self.raiseErrorMessage(f"{reader.classType} cache has no channels")
+
+            position = min(max(frame - reader.startFrame, 0), reader.n - 1)
+            index = int(floor(position))
+
+            outputs = []
+            for socket, channel in zip(self.outputs, self.channels):
+                if reader.channels.get(channel.name, (None, None))[1] != channel.classType:
+                    outputs.append(socket.getDefaultValue())
+                else:
+                    # Fractional frames are blended from the two stored frames around them.
+                    outputs.append(reader.interpolate(index, position - index, channel.name))
+
+        except Exception as e:
+            self.raiseErrorMessage("ERROR: " + str(e))
+            outputs = [socket.getDefaultValue() for socket in self.outputs]
+
+        if len(outputs) == 1:
+            return outputs[0]
+        return tuple(outputs)
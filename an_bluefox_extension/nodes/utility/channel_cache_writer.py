@@ -0,0 +1,119 @@
+import bpy
+from bpy.props import *
+from ... utils import save_to_disk as sd
+from . disk_cache_writer import classTypeItems
+from animation_nodes . base_types import AnimationNode
+
+channelTypeItems = {item for item in classTypeItems if item[0] != "MESH"}
+
+def channelChanged(self, context):
+    path = self.path_from_id()
+    node = self.id_data.path_resolve(path[:path.rfind(".channels")])
+    node.refresh()
+
+class BF_CacheChannel(bpy.types.PropertyGroup):
+    name: StringProperty(name="Name", default="Channel", update=channelChanged)
+    classType: EnumProperty(name="List Type", default="VECTOR", items=channelTypeItems, update=channelChanged)
+
+cache = {}
+
+class BF_ChannelCacheWriterNode(bpy.types.Node, AnimationNode):
+    bl_idname = "an_bf_ChannelCacheWriterNode"
+    bl_label = "Channel Cache Writer"
+    bl_width_default = 200
+    errorHandlingType = "EXCEPTION"
+
+    channels: CollectionProperty(type=BF_CacheChannel)
+    resume: BoolProperty(name="Resume", description="Keep the frames of an existing cache and only write missing frames", default=False)
+    checkpointInterval: IntProperty(name="Checkpoint Interval", description="Save the lookup table every n frames, 0 to disable", default=25, min=0)
+    live: BoolProperty(name="Live Preview", description="Commit every frame, so readers can play the cache while it is baked", default=False)
+
+    def setup(self):
+        self.channels.add()
+
+    def create(self):
+        self.newInput("Text", "File Path", "filePath",
+            value="/tmp/an_channels.npy",
+            showFileChooser = True,
+            defaultDrawType = "PROPERTY_ONLY")
+        self.newInput("Integer", "Start Frame", "startFrame", value = 1)
+        self.newInput("Integer", "End Frame", "endFrame", value = 250)
+        for i, channel in enumerate(self.channels):
+            self.newInput(channel.classType.title() + " List", channel.name, f"channel_{i}")
+        self.newOutput("Text", "File Path", "filePath")
+
+    def draw(self, layout):
+        col = layout.column(align=True)
+        col.scale_y = 1.5
+        row = col.row(align=True)
+        self.invokeFunction(row, "writeToDisk", description="Write to disk", text="Write", icon="DISK_DRIVE")
+        self.invokeFunction(row, "deleteDiskCache", description="Delete from disk", text="Delete", icon="TRASH")
+        layout.prop(self, "resume", icon="RECOVER_LAST")
+
+        col = layout.column(align=True)
+        for i, channel in enumerate(self.channels):
+            row = col.row(align=True)
+            row.prop(channel, "name", text="")
+            row.prop(channel, "classType", text="")
+            self.invokeFunction(row, "removeChannel", icon="X", data=str(i))
+        self.invokeFunction(col, "addChannel", text="Add Channel", icon="ADD")
+
+    def drawAdvanced(self, layout):
+        layout.prop(self, "checkpointInterval")
+        layout.prop(self, "live")
+
+    def newChannel(self, name, classType):
+        channel = self.channels.add()
+        channel.name = name
+        channel.classType = classType
+
+    def addChannel(self):
+        self.newChannel(f"Channel {len(self.channels)}", "VECTOR")
+        self.refresh()
+
+    def removeChannel(self, index):
+        self.channels.remove(int(index))
+        self.refresh()
+
+    def execute(self, filePath, startFrame, endFrame, *channelData):
+        if startFrame >= endFrame:
+            self.raiseErrorMessage("End Frame should be greater than Start Frame")
+        names = [channel.name for channel in self.channels]
+        if len(set(names)) != len(names):
+            self.raiseErrorMessage("Channel names must be unique")
+
+        cache[self.identifier] = (filePath, startFrame, endFrame, channelData)
+        return filePath
+
+    def writeToDisk(self):
+        bpy.ops.an_bluefox_extension.bake_disk_cache('INVOKE_DEFAULT', treeName=self.nodeTree.name, nodeName=self.name)
+
+    def startBake(self, rebake=False):
+        # Called by the bake operator, returns the writer and the frames to bake.
+        packedData = cache.get(self.identifier, None)
+        if packedData is None or len(self.channels) == 0:
+            return None
+
+        filePath, startFrame, endFrame, _ = packedData
+        info = {
+            'n': endFrame - startFrame + 1,
+            'start_frame': startFrame,
+            'end_frame': endFrame,
+            'channels': [(channel.name, channel.classType) for channel in self.channels],
+            'checkpoint_interval': self.checkpointInterval,
+            'live': self.live,
+            'mode': "APPEND" if self.resume else "WRITE"
+        }
+        return sd.AsyncWriter(sd.ChannelWriter(filePath, info)), startFrame, range(startFrame, endFrame + 1)
+
+    def getFrameData(self):
+        packedData = cache.get(self.identifier, None)
+        return None if packedData is None else packedData[3]
+
+    def endBake(self):
+        cache.pop(self.identifier, None)
+
+    def deleteDiskCache(self):
+        packedData = cache.get(self.identifier, None)
+        if packedData:
+            sd.delete(packedData[0])
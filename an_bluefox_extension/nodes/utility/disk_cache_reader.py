@@ -1,8 +1,9 @@
 import os
 import bpy
+from math import floor
 from bpy.props import *
 from ... utils import save_to_disk as sd
-from . disk_cache_writer import classTypeItems
+from . disk_cache_writer import classTypeItems, getSocketType
 from animation_nodes . base_types import AnimationNode
 
 class BF_DiskCacheReaderNode(bpy.types.Node, AnimationNode):
@@ -12,48 +13,50 @@ class BF_DiskCacheReaderNode(bpy.types.Node, AnimationNode):
     errorHandlingType = "EXCEPTION"
 
     classType: EnumProperty(name="Output List Type", default="VECTOR", items=classTypeItems, update=AnimationNode.refresh)
+    prefetchDistance: IntProperty(name="Prefetch", description="Frames to read ahead in play direction on a background thread, 0 to disable", default=0, min=0)
 
     def create(self):
         self.newInput("Text", "File Path", "filePath",
             value="/tmp/an_cache.npy",
             showFileChooser = True,
             defaultDrawType = "PROPERTY_ONLY")
-        self.newInput("Integer", "Frame", "frame", value=1)
+        self.newInput("Float", "Frame", "frame", value=1)
         self.newInput("Boolean", "Accumulate", "accumulate", value=False)
-        socketType = self.classType.title() + " List"
-        self.newOutput(socketType, "Data", "out")
+        self.newOutput(getSocketType(self.classType), "Data", "out")
 
     def draw(self, layout):
         layout.prop(self, "classType", text="")
 
+    def drawAdvanced(self, layout):
+        layout.prop(self, "prefetchDistance")
+        filePath = self.inputs["File Path"].value
+        entry = sd.readerPool.get(os.path.abspath(filePath))
+        if entry is not None and entry[0].prefetcher is not None:
+            stats = entry[0].prefetcher.stats()
+            layout.label(text=f"Hits: {stats['hits']}  Misses: {stats['misses']}  ({stats['hit_rate']:.0%})")
+
     def execute(self, filePath, frame, accumulate):
         try:
             if not os.path.exists(filePath):
                 self.raiseErrorMessage("File does not exist")
 
-            reader = sd.Reader(filePath)
+            reader = sd.getReader(filePath)
             classType = reader.classType
             if classType != self.classType:
                 self.raiseErrorMessage(f"{classType} -> {self.classType}")
+            reader.setPrefetch(self.prefetchDistance)
 
             startFrame = reader.startFrame
-            endFrame = reader.endFrame
             length = reader.n
 
-            index = int((frame - startFrame) % length)
-            if frame < startFrame:
-                index = 0
-            if frame > endFrame:
-                index = length - 1
+            position = min(max(frame - startFrame, 0), length - 1)
+            index = int(floor(position))
 
             if accumulate and index > 0:
-                result = reader[0]
-                for i in range(min(index + 1, length)):
-                    if i > 0:
-                        result.extend(reader[i])
-                return result
+                return reader.accumulate(index)
 
-            return reader[index]
+            # Fractional frames are blended from the two stored frames around them.
+            return reader.interpolate(index, position - index)
 
         except Exception as e:
             self.raiseErrorMessage("ERROR: " + str(e))
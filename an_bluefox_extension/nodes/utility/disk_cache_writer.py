@@ -2,6 +2,7 @@ import bpy
 from bpy.props import *
 from dataclasses import dataclass
 from ... utils import save_to_disk as sd
+from ... utils . cache_encoding import encodableTypes
 from animation_nodes . base_types import AnimationNode
 
 classTypeItems = {
@@ -11,9 +12,31 @@ classTypeItems = {
     ("VECTOR", "Vector", "3D Vector list", "", 3),
     ("COLOR", "Color", "Color list", "", 4),
     ("QUATERNION", "Quaternion", "Quaternion list", "", 5),
-    ("MATRIX", "Matrix", "4x4 Matrix list", "", 6)
+    ("MATRIX", "Matrix", "4x4 Matrix list", "", 6),
+    ("MESH", "Mesh", "Mesh, edges and polygons are stored once per distinct topology", "", 7)
 }
 
+def getSocketType(classType):
+    return "Mesh" if classType == "MESH" else classType.title() + " List"
+
+layoutItems = [
+    ("RAGGED", "Ragged", "Concatenate frames and index them by offsets, lists can have any length", "", 0),
+    ("PADDED", "Padded", "Pad every frame to the max list length", "", 1),
+    ("COMPRESSED", "Compressed", "Compress chunks of frames, only the chunk of the requested frame is decompressed", "", 2)
+]
+
+encodingItems = [
+    ("NONE", "None", "Store full precision float32 values", "", 0),
+    ("FLOAT16", "Float16", "Store half precision floats", "", 1),
+    ("QUANTIZED", "Quantized", "Store 16 bit fixed point values relative to the bounding box of each frame", "", 2),
+    ("DELTA", "Key Frame + Delta", "Store quantized key frames and quantized differences to them in between", "", 3)
+]
+
+codecItems = [
+    ("ZLIB", "Zlib", "Fast compression", "", 0),
+    ("LZMA", "LZMA", "Slower but smaller compression", "", 1)
+]
+
 @dataclass
 class DataContainer:
     data: list
@@ -22,6 +45,7 @@ class DataContainer:
     startFrame: int
     endFrame: int
     maxLength: int
+    layout: str
 
 cache = {}
 
@@ -32,17 +56,32 @@ class BF_DiskCacheWriterNode(bpy.types.Node, AnimationNode):
     errorHandlingType = "EXCEPTION"
 
     classType: EnumProperty(name="Input List Type", default="VECTOR", items=classTypeItems, update=AnimationNode.refresh)
+    cacheLayout: EnumProperty(name="Layout", default="RAGGED", items=layoutItems, update=AnimationNode.refresh)
+    codec: EnumProperty(name="Codec", default="ZLIB", items=codecItems)
+    compressionLevel: IntProperty(name="Compression Level", default=6, min=0, max=9)
+    chunkSize: IntProperty(name="Chunk Size", description="Frames per compressed chunk", default=1, min=1)
+    encoding: EnumProperty(name="Encoding", default="NONE", items=encodingItems)
+    keyframeInterval: IntProperty(name="Key Frame Interval", description="Store a full frame every n frames", default=10, min=1)
+    resume: BoolProperty(name="Resume", description="Keep the frames of an existing cache and only write missing frames", default=False)
+    checkpointInterval: IntProperty(name="Checkpoint Interval", description="Save the lookup table every n frames, 0 to disable", default=25, min=0)
+    live: BoolProperty(name="Live Preview", description="Commit every frame, so readers can play the cache while it is baked", default=False)
+    shardSize: IntProperty(name="Shard Size", description="Split the cache into files of n frames, created as the bake proceeds. 0 to disable", default=0, min=0)
+    rebakeStart: IntProperty(name="Start", default=1)
+    rebakeEnd: IntProperty(name="End", default=250)
+    rangeOnly: BoolProperty(name="Write Range Only", default=False,
+        description="Write only the frames from Start to End, the other frames are kept. Separate processes can bake "
+                    "disjoint ranges of a sharded cache, ranges should start and end at shard boundaries")
 
     def create(self):
         self.newInput("Text", "File Path", "filePath",
             value="/tmp/an_cache.npy",
             showFileChooser = True,
             defaultDrawType = "PROPERTY_ONLY")
-        socketType = self.classType.title() + " List"
-        self.newInput(socketType, "Data", "data")
+        self.newInput(getSocketType(self.classType), "Data", "data")
         self.newInput("Integer", "Start Frame", "startFrame", value = 1)
         self.newInput("Integer", "End Frame", "endFrame", value = 250)
-        self.newInput("Integer", "Max List Length", "maxListLength", minValue=1, value = 1000)
+        self.newInput("Integer", "Max List Length", "maxListLength", minValue=1, value = 1000,
+            hide = self.cacheLayout == "RAGGED")
         self.newOutput("Text", "File Path", "filePath")
 
     def draw(self, layout):
@@ -56,57 +95,89 @@ class BF_DiskCacheWriterNode(bpy.types.Node, AnimationNode):
         subcol = col.column(align=True)
         row = subcol.row(align=True)
         row.prop(self, "classType", text='')
+        row.prop(self, "resume", text='', icon="RECOVER_LAST")
+
+    def drawAdvanced(self, layout):
+        layout.prop(self, "cacheLayout")
+        layout.prop(self, "checkpointInterval")
+        layout.prop(self, "live")
+        layout.prop(self, "shardSize")
+        if self.cacheLayout == "COMPRESSED":
+            col = layout.column(align=True)
+            col.prop(self, "codec", text="")
+            col.prop(self, "compressionLevel")
+            col.prop(self, "chunkSize")
+        if self.classType in encodableTypes:
+            col = layout.column(align=True)
+            col.prop(self, "encoding", text="")
+            if self.encoding == "DELTA":
+                col.prop(self, "keyframeInterval")
 
-    def writeToDisk(self):
-        wm = bpy.context.window_manager
-        wm.progress_begin(0, 100)
-        wm.progress_update(1)
-
-        try:
-            packedData = cache.get(self.identifier, None)
-            if packedData is None: return
-
-            filePath = packedData.filePath
-            classType = packedData.classType
-            startFrame = packedData.startFrame
-            endFrame = packedData.endFrame
-            maxLength = packedData.maxLength
-
-            if maxLength < 1 : return
-            n = endFrame - startFrame + 1
-
-            info = {
-                'n': n,
-                'max_length': maxLength,
-                'start_frame': startFrame,
-                'end_frame': endFrame,
-                'class_type': classType
-            }
-            restoreFrame = bpy.context.scene.frame_current
-            with sd.Writer(filePath, info) as f:
-                count = 0
-                for i in range(startFrame, endFrame + 1):
-                    bpy.context.scene.frame_set(i)
-                    data = cache.get(self.identifier, None).data
-                    if data is None:return
-                    f.add(data)
-                    wm.progress_update(int((count/n) * 100))
-                    count += 1
-            bpy.context.scene.frame_set(restoreFrame)
-
-        except Exception as e:
-            print("Disk writing Failed")
-            print(str(e))
+        col = layout.column(align=True)
+        row = col.row(align=True)
+        row.prop(self, "rebakeStart")
+        row.prop(self, "rebakeEnd")
+        col.prop(self, "rangeOnly")
+        self.invokeFunction(col, "rebakeRange", description="Write the frame range again, keep the other frames. Separate processes can bake disjoint ranges of a sharded cache",
+            text="Re-bake Range", icon="FILE_REFRESH")
 
+    def writeToDisk(self):
+        bpy.ops.an_bluefox_extension.bake_disk_cache('INVOKE_DEFAULT', treeName=self.nodeTree.name, nodeName=self.name)
+
+    def rebakeRange(self):
+        bpy.ops.an_bluefox_extension.bake_disk_cache('INVOKE_DEFAULT', treeName=self.nodeTree.name, nodeName=self.name, rebake=True)
+
+    def startBake(self, rebake=False):
+        # Called by the bake operator, returns the writer and the frames to bake.
+        packedData = cache.get(self.identifier, None)
+        if packedData is None or packedData.maxLength < 1:
+            return None
+
+        startFrame = packedData.startFrame
+        endFrame = packedData.endFrame
+        # Writing a range re-bakes it, unless the missing frames are resumed.
+        useRange = rebake or self.rangeOnly
+        rebake = rebake or (self.rangeOnly and not self.resume)
+        info = {
+            'n': endFrame - startFrame + 1,
+            'max_length': packedData.maxLength,
+            'start_frame': startFrame,
+            'end_frame': endFrame,
+            'class_type': packedData.classType,
+            'layout': packedData.layout,
+            'codec': self.codec,
+            'level': self.compressionLevel,
+            'chunk_size': self.chunkSize,
+            'encoding': self.encoding,
+            'keyframe_interval': self.keyframeInterval,
+            'checkpoint_interval': self.checkpointInterval,
+            'shard_size': self.shardSize,
+            'live': self.live,
+            'mode': "APPEND" if self.resume or useRange else "WRITE"
+        }
+        writer = sd.openWriter(packedData.filePath, info)
+        if not useRange:
+            return sd.AsyncWriter(writer), startFrame, range(startFrame, endFrame + 1)
+        rangeStart = max(startFrame, self.rebakeStart)
+        rangeEnd = min(endFrame, self.rebakeEnd)
+        if rebake and rangeStart <= rangeEnd:
+            writer.invalidate(rangeStart - startFrame, rangeEnd - startFrame + 1)
+        return sd.AsyncWriter(writer), startFrame, range(rangeStart, rangeEnd + 1)
+
+    def getFrameData(self):
+        packedData = cache.get(self.identifier, None)
+        return None if packedData is None else packedData.data
+
+    def endBake(self):
         self.delete()
-        wm.progress_end()
 
     def execute(self, filePath, data, startFrame, endFrame, maxListLength):
         if startFrame >= endFrame:
             self.raiseErrorMessage("End Frame should be greater than Start Frame")
+        if self.cacheLayout == "PADDED" and self.classType == "MESH":
+            self.raiseErrorMessage("Meshes can't be padded, use the Ragged or Compressed layout")
 
-        listLength = len(data)
-        if listLength > maxListLength:
+        if self.cacheLayout == "PADDED" and self.classType != "MESH" and len(data) > maxListLength:
             data = data[:maxListLength]
 
         cache[self.identifier] = DataContainer(
@@ -115,7 +186,8 @@ class BF_DiskCacheWriterNode(bpy.types.Node, AnimationNode):
             self.classType,
             startFrame,
             endFrame,
-            maxListLength)
+            maxListLength,
+            self.cacheLayout)
 
         return filePath
 
@@ -0,0 +1,118 @@
+import bpy
+from time import perf_counter
+
+class BF_BakeDiskCache(bpy.types.Operator):
+    bl_idname = 'an_bluefox_extension.bake_disk_cache'
+    bl_label = 'Bake Disk Cache'
+    bl_description = 'Writes the frames of a disk cache writer node, press Esc to stop'
+    bl_options = {'INTERNAL'}
+
+    treeName: bpy.props.StringProperty(
+        name = 'Node Tree',
+        description = 'Node tree of the writer node')
+
+    nodeName: bpy.props.StringProperty(
+        name = 'Node Name',
+        description = 'Name of the writer node')
+
+    rebake: bpy.props.BoolProperty(
+        name = 'Re-bake',
+        description = 'Write the re-bake range of the node again',
+        default = False)
+
+    timeBudget: bpy.props.FloatProperty(
+        name = 'Time Budget',
+        description = 'Seconds spent on baking per timer tick, the UI stays responsive in between',
+        default = 0.1, min = 0.01)
+
+    def getNode(self):
+        # The node is looked up on every tick, it can be deleted while baking.
+        tree = bpy.data.node_groups.get(self.treeName)
+        return tree.nodes.get(self.nodeName) if tree else None
+
+    def invoke(self, context, event):
+        node = self.getNode()
+        if node is None:
+            self.report({'ERROR'}, f'Node not found: {self.nodeName}')
+            return {'CANCELLED'}
+
+        try:
+            bake = node.startBake(self.rebake)
+        except Exception as e:
+            self.report({'ERROR'}, f'Disk writing failed: {e}')
+            return {'CANCELLED'}
+        if bake is None:
+            return {'CANCELLED'}
+
+        self.writer, self.startFrame, self.frames = bake
+        self.position = 0
+        self.bakedFrames = 0
+        self.startTime = perf_counter()
+        self.restoreFrame = context.scene.frame_current
+
+        wm = context.window_manager
+        wm.progress_begin(0, len(self.frames))
+        self.timer = wm.event_timer_add(0.001, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.finish(context, "Baking stopped")
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        node = self.getNode()
+        if node is None:
+            return self.finish(context, "Baking stopped, the node was removed", 'ERROR')
+
+        tickStart = perf_counter()
+        try:
+            while self.position < len(self.frames) and perf_counter() - tickStart < self.timeBudget:
+                frame = self.frames[self.position]
+                self.position += 1
+                # Resuming skips the written frames and the frames another process bakes.
+                if self.writer.isFilled(frame - self.startFrame) or self.writer.isLocked(frame - self.startFrame):
+                    continue
+                context.scene.frame_set(frame)
+                data = node.getFrameData()
+                if data is None:
+                    return self.finish(context, "Baking stopped, the node has no data")
+                self.writer.write(frame - self.startFrame, data)
+                self.bakedFrames += 1
+        except Exception as e:
+            return self.finish(context, f"Disk writing failed: {e}", 'ERROR')
+
+        if self.position >= len(self.frames):
+            return self.finish(context, "Baking finished")
+
+        self.showProgress(context)
+        return {'RUNNING_MODAL'}
+
+    def showProgress(self, context):
+        duration = perf_counter() - self.startTime
+        fps = self.bakedFrames / duration if duration > 0 else 0
+        eta = (len(self.frames) - self.position) / fps if fps > 0 else 0
+        megabytes = self.writer.bytesWritten / 2**20
+        context.window_manager.progress_update(self.position)
+        context.workspace.status_text_set(
+            f"Baking frame {self.position}/{len(self.frames)} | {fps:.1f} fps | "
+            f"ETA {eta:.0f}s | {megabytes:.1f} MB written | Esc to stop")
+
+    def finish(self, context, message, level='INFO'):
+        # Flushing keeps every written frame, so a stopped bake leaves a valid partial cache.
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+        try:
+            self.writer.flush()
+        except Exception as e:
+            message, level = f"Disk writing failed: {e}", 'ERROR'
+        context.scene.frame_set(self.restoreFrame)
+        node = self.getNode()
+        if node is not None:
+            node.endBake()
+
+        megabytes = self.writer.bytesWritten / 2**20
+        self.report({level}, f"{message}: {self.bakedFrames} frames, {megabytes:.1f} MB written")
+        return {'FINISHED'} if level == 'INFO' else {'CANCELLED'}
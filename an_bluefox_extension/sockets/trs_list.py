@@ -0,0 +1,36 @@
+import bpy
+from .. utils . trs import TRSList
+from animation_nodes . data_structures import Matrix4x4List
+from animation_nodes . base_types import AnimationNodeSocket
+
+class BF_TRSListSocket(bpy.types.NodeSocket, AnimationNodeSocket):
+    '''Decomposed matrices passed between effex nodes, hidden by default.
+    Matrices that can't be decomposed exactly are passed as a Matrix4x4List.'''
+    bl_idname = "an_bf_TRSListSocket"
+    bl_label = "TRS List Socket"
+    dataType = "BF TRS List"
+    drawColor = (0.8, 0.45, 0.9, 1)
+    storable = True
+    comparable = False
+
+    @classmethod
+    def getDefaultValue(cls):
+        return TRSList()
+
+    @classmethod
+    def getCopyExpression(cls):
+        return "value.copy()"
+
+    @classmethod
+    def correctValue(cls, value):
+        if isinstance(value, (TRSList, Matrix4x4List)):
+            return value, 0
+        return cls.getDefaultValue(), 2
+
+def register():
+    # Socket types are collected when Animation Nodes registers, add this one as well.
+    try:
+        from animation_nodes . sockets . info import updateSocketInfo
+        updateSocketInfo()
+    except ImportError:
+        pass
@@ -65,6 +65,7 @@ class BF_MatrixMenu(bpy.types.Menu):
     def draw(self, context):
         layout = self.layout
         layout.label(text = "Effex Nodes")
+        insertNode(layout, "an_bf_EffexStackNode", "Effex Stack")
         insertNode(layout, "an_bf_FormulaEffexNode", "Formula Effex")
         insertNode(layout, "an_bf_InheritanceEffexNode", "Inheritance Effex")
         insertNode(layout, "an_bf_StepEffexNode", "Step Effex")
@@ -109,6 +110,9 @@ class BF_UtilityMenu(bpy.types.Menu):
         insertNode(layout, "an_bf_AlembicExporterNode", "Alembic Exporter")
         insertNode(layout, "an_bf_AutoFitVectorsNode", "Auto Fit Vectors")
         insertNode(layout, "an_bf_AutoFitFloatsNode", "Auto Fit Floats")
+        insertNode(layout, "an_bf_CacheVelocityNode", "Cache Velocity")
+        insertNode(layout, "an_bf_ChannelCacheReaderNode", "Channel Cache Reader")
+        insertNode(layout, "an_bf_ChannelCacheWriterNode", "Channel Cache Writer")
         insertNode(layout, "an_bf_ClampVectorNode", "Clamp Vector")
         insertNode(layout, "an_bf_CSV_WriterNode", "CSV Writer")
         insertNode(layout, "an_bf_DiskCacheReaderNode", "Disk Cache Reader")
@@ -0,0 +1,144 @@
+import numpy as np
+
+# Lossy encodings for float based disk caches (vectors, colors, quaternions, matrices and mesh vertices).
+# Encoded frames are stored by the regular storage layouts, decoding always returns float32.
+
+encodableTypes = ["VECTOR", "COLOR", "QUATERNION", "MATRIX", "MESH"]
+
+def getEncoding(meta):
+    encoding = meta.get('encoding', "NONE")
+    if encoding == "NONE":
+        return NoEncoding()
+    elif encoding == "FLOAT16":
+        return Float16Encoding()
+    elif encoding == "QUANTIZED":
+        return QuantizedEncoding()
+    elif encoding == "DELTA":
+        return DeltaEncoding(meta['keyframe_interval'])
+    raise ValueError("Unknown encoding " + encoding)
+
+class NoEncoding:
+    headerRows = 0
+    isFramewise = False
+    isIdentity = True
+
+    def getStoredDtype(self, dtype):
+        return dtype
+
+    def encode(self, i, array):
+        return array
+
+    def decode(self, i, stored, readStored):
+        return stored
+
+    def getInvalidationEnd(self, stop):
+        return stop
+
+class Float16Encoding:
+    headerRows = 0
+    isFramewise = False
+    isIdentity = False
+
+    def getStoredDtype(self, dtype):
+        return "float16"
+
+    def encode(self, i, array):
+        return array.astype('float16')
+
+    def decode(self, i, stored, readStored):
+        return stored.astype('float32')
+
+    def getInvalidationEnd(self, stop):
+        return stop
+
+class QuantizedEncoding:
+    '''
+    Every frame is quantized to uint16 against its own bounding box.
+    The first `headerRows` rows of a stored frame hold the float32 minimum
+    and step per component followed by the index of the frame it is
+    relative to (the frame itself for key frames).
+    '''
+    headerRows = 6
+    isFramewise = True
+    isIdentity = False
+
+    def getStoredDtype(self, dtype):
+        return "uint16"
+
+    def encode(self, i, array):
+        return quantize(array, i)
+
+    def decode(self, i, stored, readStored):
+        return dequantize(stored)[0]
+
+    def getInvalidationEnd(self, stop):
+        return stop
+
+class DeltaEncoding(QuantizedEncoding):
+    '''
+    Every `keyframeInterval`-th frame is a quantized key frame, the frames
+    in between store quantized differences to the decoded key frame.
+    A frame whose length differs from the key frame becomes a key frame itself.
+    '''
+    def __init__(self, keyframeInterval):
+        self.keyframeInterval = max(1, keyframeInterval)
+        self.keyIndex = -1
+        self.keyFrame = None
+
+    def encode(self, i, array):
+        blockStart = i - i % self.keyframeInterval
+        if blockStart <= self.keyIndex < i and len(array) == len(self.keyFrame):
+            return quantize(array - self.keyFrame, self.keyIndex)
+
+        stored = quantize(array, i)
+        # Deltas are taken against the decoded key frame, so errors don't accumulate.
+        self.keyFrame = dequantize(stored)[0]
+        self.keyIndex = i
+        return stored
+
+    def decode(self, i, stored, readStored):
+        values, keyIndex = dequantize(stored)
+        if keyIndex is None or keyIndex == i:
+            return values
+        if keyIndex != self.keyIndex:
+            self.keyFrame = dequantize(readStored(keyIndex))[0]
+            self.keyIndex = keyIndex
+        return values + self.keyFrame
+
+    def getInvalidationEnd(self, stop):
+        # Frames after a re-baked range must not refer to a key frame inside of it.
+        self.keyIndex = -1
+        return stop + (-stop) % self.keyframeInterval
+
+def quantize(array, keyIndex):
+    headerRows = QuantizedEncoding.headerRows
+    itemShape = array.shape[1:]
+    components = int(np.prod(itemShape))
+    values = array.reshape(-1, components)
+
+    header = np.zeros((3, components), 'float32')
+    header[2, 0] = keyIndex
+    if len(values) > 0:
+        low = values.min(axis=0)
+        step = (values.max(axis=0) - low) / 65535
+        step[step == 0] = 1
+        header[0] = low
+        header[1] = step
+        quantized = np.rint((values - low) / step).astype('uint16')
+    else:
+        quantized = np.zeros((0, components), 'uint16')
+
+    headerData = header.view('uint16').reshape(headerRows, components)
+    return np.concatenate((headerData, quantized)).reshape(-1, *itemShape)
+
+def dequantize(stored):
+    headerRows = QuantizedEncoding.headerRows
+    itemShape = stored.shape[1:]
+    components = int(np.prod(itemShape))
+    stored = np.ascontiguousarray(stored).reshape(-1, components)
+    if len(stored) < headerRows:
+        return np.zeros((0, *itemShape), 'float32'), None
+
+    header = stored[0:headerRows].reshape(-1).view('float32').reshape(3, components)
+    values = stored[headerRows:] * header[1] + header[0]
+    return values.astype('float32').reshape(-1, *itemShape), int(header[2, 0])
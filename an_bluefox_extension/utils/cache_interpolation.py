@@ -0,0 +1,72 @@
+import numpy as np
+
+# Blending of two decoded disk cache frames for sub-frame reads.
+# Frames of different length can't be blended, the nearest frame is returned instead.
+
+def interpolateFrames(a, b, t, classType):
+    if a.shape != b.shape:
+        return a if t < 0.5 else b
+    if classType in ("FLOAT", "VECTOR", "COLOR"):
+        return lerp(a, b, t)
+    elif classType == "INTEGER":
+        return np.rint(lerp(a, b, t)).astype(a.dtype)
+    elif classType == "QUATERNION":
+        return nlerp(a, b, t)
+    elif classType == "MATRIX":
+        return matrixLerp(a, b, t)
+    return a if t < 0.5 else b
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+def nlerp(a, b, t):
+    # Blend along the shorter arc, q and -q are the same rotation.
+    sign = np.where(np.sum(a * b, axis=1) < 0, -1, 1).astype(a.dtype)
+    q = lerp(a, b * sign[:, None], t)
+    length = np.linalg.norm(q, axis=1)
+    length[length == 0] = 1
+    return (q / length[:, None]).astype(a.dtype)
+
+def matrixLerp(a, b, t):
+    # Matrices are stored column by column, transpose to get row major matrices.
+    translationA, rotationA, scaleA = decompose(a.transpose(0, 2, 1))
+    translationB, rotationB, scaleB = decompose(b.transpose(0, 2, 1))
+
+    result = np.zeros(a.shape, 'float64')
+    rotation = quaternionToMatrix(nlerp(rotationA, rotationB, t))
+    result[:, :3, :3] = rotation * lerp(scaleA, scaleB, t)[:, None, :]
+    result[:, :3, 3] = lerp(translationA, translationB, t)
+    result[:, 3, 3] = 1
+    return result.transpose(0, 2, 1).astype(a.dtype)
+
+def decompose(matrices):
+    basis = matrices[:, :3, :3].astype('float64')
+    scale = np.linalg.norm(basis, axis=1)
+    # A mirrored basis is stored as a negative x scale.
+    scale[np.linalg.det(basis) < 0, 0] *= -1
+    safeScale = np.where(scale == 0, 1, scale)
+    rotation = basis / safeScale[:, None, :]
+    return matrices[:, :3, 3].astype('float64'), matrixToQuaternion(rotation), scale
+
+def matrixToQuaternion(r):
+    m00, m11, m22 = r[:, 0, 0], r[:, 1, 1], r[:, 2, 2]
+    q = np.empty((len(r), 4), 'float64')
+    q[:, 0] = np.sqrt(np.maximum(0, 1 + m00 + m11 + m22)) / 2
+    q[:, 1] = np.copysign(np.sqrt(np.maximum(0, 1 + m00 - m11 - m22)) / 2, r[:, 2, 1] - r[:, 1, 2])
+    q[:, 2] = np.copysign(np.sqrt(np.maximum(0, 1 - m00 + m11 - m22)) / 2, r[:, 0, 2] - r[:, 2, 0])
+    q[:, 3] = np.copysign(np.sqrt(np.maximum(0, 1 - m00 - m11 + m22)) / 2, r[:, 1, 0] - r[:, 0, 1])
+    return q
+
+def quaternionToMatrix(q):
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    r = np.empty((len(q), 3, 3), 'float64')
+    r[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    r[:, 0, 1] = 2 * (x * y - w * z)
+    r[:, 0, 2] = 2 * (x * z + w * y)
+    r[:, 1, 0] = 2 * (x * y + w * z)
+    r[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    r[:, 1, 2] = 2 * (y * z - w * x)
+    r[:, 2, 0] = 2 * (x * z - w * y)
+    r[:, 2, 1] = 2 * (y * z + w * x)
+    r[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    return r
@@ -0,0 +1,97 @@
+'''
+Rewrites a disk cache into another layout, codec or encoding, frame by frame.
+Runs without Blender, only Python and NumPy are needed:
+
+    python cache_repack.py /path/cache.npy /path/packed.npy --layout COMPRESSED --codec ZLIB --encoding DELTA
+'''
+import sys
+import argparse
+from time import perf_counter
+from os.path import isfile, abspath, dirname, getsize
+
+if __package__:
+    from . import save_to_disk as sd
+else:
+    # Run as a script, import the utils folder as a package.
+    sys.path.insert(0, dirname(dirname(abspath(__file__))))
+    from utils import save_to_disk as sd
+
+def getCacheSize(fileName):
+    paths = sd.getCacheFiles(fileName) + (sd.getTopologyFile(fileName), sd.getTopologyJournalFile(fileName),
+                                          sd.getJournalFile(fileName))
+    return sum(getsize(path) for path in paths if isfile(path))
+
+def repack(source, target, layout="RAGGED", codec="ZLIB", level=6, chunkSize=8,
+           encoding="NONE", keyframeInterval=10, report=print):
+    if abspath(source) == abspath(target):
+        raise ValueError("Source and target must be different caches")
+    if not all(isfile(path) for path in sd.getCacheFiles(source)):
+        raise ValueError(f"{source} is not a complete cache")
+
+    reader = sd.openReader(source)
+    if reader.classType == "CHANNELS" or isinstance(reader, sd.ShardedReader):
+        raise ValueError("Only single caches can be repacked")
+
+    maxLength = None
+    if layout == "PADDED":
+        maxLength = max(max(len(reader.read(i)) for i in range(reader.n)), 1)
+
+    info = {
+        'n': reader.n,
+        'max_length': maxLength,
+        'start_frame': reader.startFrame,
+        'end_frame': reader.endFrame,
+        'class_type': reader.classType,
+        'layout': layout,
+        'codec': codec,
+        'level': level,
+        'chunk_size': chunkSize,
+        'encoding': encoding,
+        'keyframe_interval': keyframeInterval
+    }
+
+    start = perf_counter()
+    readBytes = 0
+    with sd.openWriter(target, info) as writer:
+        for i in range(reader.n):
+            # Frames that were never baked stay unwritten, a resumed bake still writes them.
+            if not reader.layout.isFilled(i):
+                continue
+            array = reader.read(i)
+            readBytes += array.nbytes
+            if reader.classType == "MESH":
+                topologyId = int(reader.topologyIds[i])
+                topology = reader.topologies[topologyId] if topologyId >= 0 else ((),) * 4
+                writer.insertMesh(i, array, topology)
+            else:
+                writer.insert(i, array)
+    reader.close()
+    duration = perf_counter() - start
+
+    sourceSize, targetSize = getCacheSize(source), getCacheSize(target)
+    report(f"Frames:     {reader.n}")
+    report(f"Before:     {sourceSize / 2**20:.2f} MiB")
+    report(f"After:      {targetSize / 2**20:.2f} MiB ({targetSize / max(sourceSize, 1):.1%})")
+    report(f"Throughput: {reader.n / duration:.1f} frames/s, {readBytes / 2**20 / duration:.2f} MiB/s")
+    return sourceSize, targetSize
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Repack an Animation Nodes disk cache.")
+    parser.add_argument("source", help="cache file to read")
+    parser.add_argument("target", help="cache file to write")
+    parser.add_argument("--layout", default="RAGGED", choices=sorted(sd.layouts.keys()))
+    parser.add_argument("--codec", default="ZLIB", choices=["ZLIB", "LZMA"])
+    parser.add_argument("--level", default=6, type=int, help="compression level")
+    parser.add_argument("--chunk-size", default=8, type=int, help="frames per compressed chunk")
+    parser.add_argument("--encoding", default="NONE", choices=["NONE", "FLOAT16", "QUANTIZED", "DELTA"])
+    parser.add_argument("--keyframe-interval", default=10, type=int)
+    args = parser.parse_args(argv)
+
+    try:
+        repack(args.source, args.target, args.layout, args.codec, args.level,
+               args.chunk_size, args.encoding, args.keyframe_interval)
+    except (ValueError, AssertionError, OSError) as e:
+        parser.exit(1, f"Repacking failed: {e}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import pickle
+from os import remove
+from shutil import rmtree
+from os.path import join, isfile
+from tempfile import mkdtemp
+
+# Scrub-safe state of frame accumulating nodes. A store keeps a snapshot of the
+# node state every `interval` frames and the inputs of every frame. The state of
+# any frame is rebuilt from the nearest earlier snapshot by replaying at most
+# `interval` inputs, instead of replaying everything since the reset frame.
+# Entries are pickled, once the store holds more than `memoryLimit` bytes the
+# oldest entries are moved to files in a temporary directory of the store
+# (when `spillToDisk` is set). The directory is removed when the store is cleared.
+
+class CheckpointStore:
+    def __init__(self, key, interval=10, spillToDisk=False, memoryLimit=64 * 2**20):
+        self.key = key
+        self.interval = max(int(interval), 1)
+        self.spillToDisk = spillToDisk
+        self.spillDirectory = None
+        self.memoryLimit = memoryLimit
+        self.checkpoints = {}
+        self.inputs = {}
+        self.memoryUsage = 0
+        self.lastFrame = None
+        self.replayedFrames = 0
+
+    def isCheckpointFrame(self, frame):
+        return frame % self.interval == 0
+
+    def save(self, frame, state, force=False):
+        if force or self.isCheckpointFrame(frame):
+            self.setEntry(self.checkpoints, frame, state)
+
+    def record(self, frame, inputs):
+        self.setEntry(self.inputs, frame, inputs)
+
+    def rebuild(self, frame, step, load=None):
+        '''Returns the state after `frame`, or None when there is no earlier snapshot.
+        load(snapshot) turns a snapshot into a state again and
+        step(state, inputs) has to return the state after applying the inputs.'''
+        earlier = [k for k in self.checkpoints if k <= frame]
+        if not earlier:
+            return None
+        start = max(earlier)
+        state = self.getEntry(self.checkpoints, start)
+        if load is not None:
+            state = load(state)
+        for k in range(start + 1, frame + 1):
+            if k in self.inputs:
+                state = step(state, self.getEntry(self.inputs, k))
+                self.replayedFrames += 1
+        return state
+
+    def isSequential(self, frame):
+        return self.lastFrame is not None and frame == self.lastFrame + 1
+
+    def setEntry(self, entries, frame, value):
+        self.removeEntry(entries, frame)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        entries[frame] = data
+        self.memoryUsage += len(data)
+        if self.memoryUsage > self.memoryLimit and self.spillToDisk:
+            self.spill()
+
+    def getEntry(self, entries, frame):
+        data = entries[frame]
+        if isinstance(data, str):
+            with open(data, "rb") as f:
+                data = f.read()
+        return pickle.loads(data)
+
+    def removeEntry(self, entries, frame):
+        data = entries.pop(frame, None)
+        if isinstance(data, bytes):
+            self.memoryUsage -= len(data)
+        elif isinstance(data, str) and isfile(data):
+            remove(data)
+
+    def spill(self):
+        # Inputs and snapshots far from the current frame are the least likely to be needed.
+        if self.spillDirectory is None:
+            self.spillDirectory = mkdtemp(prefix="an_bluefox_checkpoints_")
+        current = self.lastFrame or 0
+        for entries, kind in ((self.inputs, "inputs"), (self.checkpoints, "state")):
+            frames = sorted(entries, key=lambda k: -abs(k - current))
+            for frame in frames:
+                if self.memoryUsage <= self.memoryLimit // 2:
+                    return
+                data = entries[frame]
+                if not isinstance(data, bytes):
+                    continue
+                path = join(self.spillDirectory, f"{kind}_{frame}.pkl")
+                with open(path, "wb") as f:
+                    f.write(data)
+                entries[frame] = path
+                self.memoryUsage -= len(data)
+
+    def clear(self):
+        for entries in (self.checkpoints, self.inputs):
+            for frame in list(entries):
+                self.removeEntry(entries, frame)
+        if self.spillDirectory is not None:
+            rmtree(self.spillDirectory, ignore_errors=True)
+            self.spillDirectory = None
+        self.lastFrame = None
+        self.replayedFrames = 0
+
+    def stats(self):
+        return {
+            "checkpoints": len(self.checkpoints),
+            "inputs": len(self.inputs),
+            "memory": self.memoryUsage,
+            "spilled": sum(isinstance(data, str) for entries in (self.checkpoints, self.inputs)
+                           for data in entries.values()),
+            "replayed": self.replayedFrames
+        }
+
+# Stores keyed by node identifier.
+checkpointStores = {}
+
+def getCheckpointStore(key, interval=10, spill=False):
+    store = checkpointStores.get(key)
+    if store is None or store.interval != max(int(interval), 1) or store.spillToDisk != spill:
+        if store is not None:
+            store.clear()
+        store = CheckpointStore(key, interval, spill)
+        checkpointStores[key] = store
+    return store
+
+def removeCheckpointStores(prefix):
+    for key in [key for key in checkpointStores if key.startswith(prefix)]:
+        checkpointStores.pop(key).clear()
+
+def unregister():
+    removeCheckpointStores("")
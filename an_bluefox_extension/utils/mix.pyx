@@ -16,17 +16,41 @@ from animation_nodes . data_structures cimport (
 )
 
 cdef eulerToQuaternion(Quaternion *q, Euler3 *e):
-    cdef float c1 = cos(e.x)
-    cdef float s1 = sin(e.x)
-    cdef float c2 = cos(e.y)
-    cdef float s2 = sin(e.y)
-    cdef float c3 = cos(e.z)
-    cdef float s3 = sin(e.z)
-    q.w = sqrt(1.0 + c1 * c2 + c1*c3 - s1 * s2 * s3 + c2*c3) / 2.0
-    cdef float w4 = (4.0 * q.w)
-    q.x = (c2 * s3 + c1 * s3 + s1 * s2 * c3) / w4
-    q.y = (s1 * c2 + s1 * c3 + c1 * s2 * s3) / w4
-    q.z = (-s1 * s3 + c1 * s2 * c3 +s2) / w4
+    # Built from the rotation matrix, so every euler order matches the matrices.
+    cdef Matrix4 m
+    cdef Vector3 origin = Vector3(0, 0, 0)
+    cdef Vector3 unitScale = Vector3(1, 1, 1)
+    setTranslationRotationScaleMatrix(&m, &origin, e, &unitScale)
+    rotationMatrixToQuaternion(q, &m)
+
+cdef rotationMatrixToQuaternion(Quaternion *q, Matrix4 *m):
+    # Expects an orthonormal 3x3 part.
+    cdef float f
+    cdef float trace = m.a11 + m.a22 + m.a33
+    if trace > 0:
+        f = sqrt(trace + 1) * 2
+        q.w = f / 4
+        q.x = (m.a32 - m.a23) / f
+        q.y = (m.a13 - m.a31) / f
+        q.z = (m.a21 - m.a12) / f
+    elif m.a11 > m.a22 and m.a11 > m.a33:
+        f = sqrt(1 + m.a11 - m.a22 - m.a33) * 2
+        q.w = (m.a32 - m.a23) / f
+        q.x = f / 4
+        q.y = (m.a12 + m.a21) / f
+        q.z = (m.a13 + m.a31) / f
+    elif m.a22 > m.a33:
+        f = sqrt(1 + m.a22 - m.a11 - m.a33) * 2
+        q.w = (m.a13 - m.a31) / f
+        q.x = (m.a12 + m.a21) / f
+        q.y = f / 4
+        q.z = (m.a23 + m.a32) / f
+    else:
+        f = sqrt(1 + m.a33 - m.a11 - m.a22) * 2
+        q.w = (m.a21 - m.a12) / f
+        q.x = (m.a13 + m.a31) / f
+        q.y = (m.a23 + m.a32) / f
+        q.z = f / 4
 
 cdef quaternionToMatrix4(Matrix4 *m, Quaternion *q):
     cdef float sqw, sqx, sqy, sqz, invs, tmp1, tmp2
@@ -70,6 +94,15 @@ def quaternionsToEulers(QuaternionList q):
         quaternionToEulerInPlace(&e.data[i], &q.data[i])
     return e
 
+def eulersToQuaternions(EulerList e):
+    cdef Py_ssize_t i
+    cdef Py_ssize_t amount = e.length
+    cdef QuaternionList q = QuaternionList(length = amount)
+
+    for i in range(amount):
+        eulerToQuaternion(&q.data[i], &e.data[i])
+    return q
+
 def quaternionsToMatrices(QuaternionList q):
     cdef Py_ssize_t count = len(q)
     cdef Matrix4x4List m = Matrix4x4List(length = count)
@@ -1,22 +1,51 @@
 # Reference: https://github.com/jutanke/memmappy
 import json
+import lzma
+import hashlib
+import zlib
 import numpy as np
-from os import remove
+from queue import Queue
+from threading import Thread, Condition, Lock, RLock
+from collections import deque, OrderedDict
+from io import BytesIO
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from os import remove, replace, stat, cpu_count
+from concurrent.futures import ThreadPoolExecutor
+from . cache_encoding import getEncoding, encodableTypes
+from . cache_interpolation import interpolateFrames
 from time import sleep
-from os.path import isfile
-from animation_nodes . data_structures import (
-    BooleanList,
-    LongList,
-    DoubleList,
-    Vector3DList,
-    ColorList,
-    QuaternionList,
-    Matrix4x4List
-)
+from os.path import isfile, abspath
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+try:
+    from animation_nodes . data_structures import (
+        BooleanList,
+        LongList,
+        DoubleList,
+        Vector3DList,
+        ColorList,
+        QuaternionList,
+        Matrix4x4List,
+        Mesh,
+        UIntegerList,
+        EdgeIndicesList,
+        PolygonIndicesList
+    )
+except ImportError:
+    # Outside of Blender (e.g. cache_repack.py) caches can only be read and written as arrays.
+    BooleanList = LongList = DoubleList = Vector3DList = ColorList = QuaternionList = Matrix4x4List = None
+    Mesh = UIntegerList = EdgeIndicesList = PolygonIndicesList = None
+
+FORMAT_VERSION = 2
 
 # Helper functions
 type1List = ["BOOLEAN", "INTEGER", "FLOAT"]
-type2List = ["VECTOR", "COLOR", "QUATERNION"]
+type2List = ["VECTOR", "COLOR", "QUATERNION", "MESH"]
 
 def getLookup(classType, n):
     if classType in type1List:
@@ -27,7 +56,7 @@ def getLookup(classType, n):
         return np.ones((n, 3), 'int32') * -1
 
 def getDtype(classType):
-    if classType in ["VECTOR", "MATRIX", "QUATERNION", "COLOR"]:
+    if classType in ["VECTOR", "MATRIX", "QUATERNION", "COLOR", "MESH"]:
         return "float32"
     if classType == "BOOLEAN":
         return "bool"
@@ -39,13 +68,95 @@ def getDtype(classType):
 def getMaxShape(classType, maxLength):
     if classType in type1List:
         return (maxLength,)
-    elif classType == "VECTOR":
+    elif classType in ["VECTOR", "MESH"]:
         return (maxLength, 3)
     elif classType in ["QUATERNION", "COLOR"]:
         return (maxLength, 4)
     elif classType == "MATRIX":
         return (maxLength, 4, 4)
 
+def getItemShape(classType):
+    return getMaxShape(classType, 0)[1:]
+
+def getOffsets(n):
+    offsets = np.ones(n + 1, 'int64') * -1
+    offsets[0] = 0
+    return offsets
+
+# In a prefix offset table `ends[i + 1]` is the end row of frame i and -1 for an
+# unwritten frame. Unwritten frames have no rows, a frame starts at the end of
+# the last written frame before it.
+
+def getStartRows(ends):
+    return np.maximum.accumulate(ends)
+
+def getNextFrame(ends):
+    written = np.flatnonzero(ends[1:] != -1)
+    return int(written[-1]) + 1 if len(written) > 0 else 0
+
+def getNextWritten(ends, i):
+    written = np.flatnonzero(ends[i + 2:] != -1)
+    return i + 1 + int(written[0]) if len(written) > 0 else len(ends) - 1
+
+def readMeta(metaFile):
+    with open(metaFile, 'r') as f:
+        meta = json.loads(''.join(f.readlines()))
+    # caches written before the format version was introduced are padded
+    meta.setdefault('version', 1)
+    meta.setdefault('layout', "PADDED")
+    return meta
+
+def writeMeta(metaFile, meta):
+    tempFile = metaFile + '.tmp'
+    with open(tempFile, 'w+') as f:
+        metaDmp = json.dumps(meta)
+        f.write(metaDmp)
+    replace(tempFile, metaFile)
+
+def saveLookup(lookupFile, lookup):
+    # Write to a temporary file first, so readers never see a partial table.
+    tempFile = lookupFile + '.tmp'
+    with open(tempFile, 'wb') as f:
+        np.save(f, lookup)
+    replace(tempFile, lookupFile)
+
+def getCacheFiles(fileName):
+    name = fileName[0:-4] if fileName.endswith('.npy') else fileName
+    return fileName, name + '_lookup.npy', name + '_meta.json'
+
+def getJournalFile(fileName):
+    name = fileName[0:-4] if fileName.endswith('.npy') else fileName
+    return name + '_commits.bin'
+
+def loadLookup(fileName):
+    '''
+    Loads the lookup table and applies the rows that a live bake committed
+    to the journal since. A journal record is the frame index followed by
+    the lookup row, an incomplete last record is ignored.
+    '''
+    fileName, lookupFile, metaFile = getCacheFiles(fileName)
+    lookup = np.load(lookupFile)
+    try:
+        records = np.fromfile(getJournalFile(fileName), 'int64')
+    except FileNotFoundError:
+        return lookup
+    width = 1 + int(np.prod(lookup.shape[1:]))
+    records = records[:len(records) - len(records) % width].reshape(-1, width)
+    # Only the last record of a row counts.
+    indices = records[::-1, 0]
+    _, last = np.unique(indices, return_index=True)
+    records = records[::-1][last]
+    lookup[records[:, 0]] = records[:, 1:].reshape(-1, *lookup.shape[1:])
+    return lookup
+
+def getTopologyFile(fileName):
+    name = fileName[0:-4] if fileName.endswith('.npy') else fileName
+    return name + '_topology.npz'
+
+def getTopologyJournalFile(fileName):
+    name = fileName[0:-4] if fileName.endswith('.npy') else fileName
+    return name + '_topology_commits.bin'
+
 def delete(fileName):
     assert isfile(fileName)
     name = fileName[0:-4] if fileName.endswith('.npy') else fileName
@@ -53,126 +164,1152 @@ def delete(fileName):
     assert isfile(lookupFile)
     metaFile = name + '_meta.json'
     assert isfile(metaFile)
+    closeReader(fileName)
+    meta = readMeta(metaFile)
+    if meta['layout'] == "SHARDED":
+        for k in range((meta['n'] - 1) // meta['shard_size'] + 1):
+            if isfile(getShardFile(fileName, k)):
+                delete(getShardFile(fileName, k))
+            if isfile(getShardLockFile(fileName, k)):
+                remove(getShardLockFile(fileName, k))
     remove(fileName)
     remove(metaFile)
     remove(lookupFile)
+    for path in (getTopologyFile(fileName), getTopologyJournalFile(fileName), getJournalFile(fileName)):
+        if isfile(path):
+            remove(path)
     sleep(0.01)
 
+listTypes = {
+    "BOOLEAN": BooleanList,
+    "INTEGER": LongList,
+    "FLOAT": DoubleList,
+    "VECTOR": Vector3DList,
+    "COLOR": ColorList,
+    "QUATERNION": QuaternionList,
+    "MATRIX": Matrix4x4List
+}
+
+# The conversions below only copy when the dtype or memory layout doesn't match.
+# A list's buffer is written to the cache as is and a contiguous memmap slice
+# is copied once, straight into the new list.
+
 def dataToArray(data, classType):
+    if classType == "MESH":
+        data = data.vertices
+    return bufferToArray(data.asNumpyArray(), classType)
+
+def bufferToArray(buffer, classType):
     dType = getDtype(classType)
     if classType == "BOOLEAN":
-        return np.frombuffer(data.asNumpyArray(), dtype=dType)
-    elif classType == "INTEGER":
-        return data.asNumpyArray().astype(dType)
-    elif classType == "FLOAT":
-        return data.asNumpyArray().astype(dType)
-    elif classType == "VECTOR":
-        return data.asNumpyArray().reshape(-1,3).astype(dType)
-    elif classType == "COLOR":
-        return data.asNumpyArray().reshape(-1,4).astype(dType)
-    elif classType == "QUATERNION":
-        return data.asNumpyArray().reshape(-1,4).astype(dType)
-    elif classType == "MATRIX":
-        return data.asNumpyArray().reshape(-1,4,4).astype(dType)
+        return np.frombuffer(buffer, dtype=dType)
+    return np.asarray(buffer, dtype=dType).reshape(-1, *getItemShape(classType))
 
 def arrayToData(array, classType):
     dType = getDtype(classType)
-    if classType == "BOOLEAN":
-        return BooleanList.fromNumpyArray(array.astype(dType))
-    elif classType == "INTEGER":
-        return LongList.fromNumpyArray(array.astype(dType))
-    elif classType == "FLOAT":
-        return DoubleList.fromNumpyArray(array.astype(dType))
-    elif classType == "VECTOR":
-        return Vector3DList.fromNumpyArray(array.ravel().astype(dType))
-    elif classType == "COLOR":
-        return ColorList.fromNumpyArray(array.ravel().astype(dType))
-    elif classType == "QUATERNION":
-        return QuaternionList.fromNumpyArray(array.ravel().astype(dType))
-    elif classType == "MATRIX":
-        return Matrix4x4List.fromNumpyArray(array.ravel().astype(dType))
+    return listTypes[classType].fromNumpyArray(np.ascontiguousarray(array, dtype=dType).reshape(-1))
+
+# Storage Layouts
+
+class PaddedLayout:
+    '''
+    Every frame is padded to `max_shape` and the lookup table
+    stores the actual shape of each frame.
+    '''
+    def __init__(self, fileName, meta, lookup, mode):
+        self.maxShape = tuple(meta['max_shape'])
+        shape = (meta['n'], *self.maxShape)
+        self.X = np.memmap(fileName, shape=shape, dtype=meta['dtype'], mode=mode)
+        self.lookup = lookup
+        self.bytesWritten = 0
+        self.cumulativeRows = None
+        self.rowIndex = None
+
+    @classmethod
+    def create(cls, fileName, meta, info):
+        meta['max_shape'] = getMaxShape(meta['class_type'], info.get('max_length'))
+        return cls(fileName, meta, getLookup(meta['class_type'], meta['n']), 'w+')
+
+    def isFilled(self, i):
+        return self.lookup[i, 0] != -1
+
+    def insert(self, i, data):
+        assert not self.isFilled(i)
+        assert len(data.shape) == len(self.maxShape)
+        for a, b in zip(data.shape, self.maxShape):
+            assert a <= b
+
+        index = (i, *(slice(0, a) for a in data.shape))
+        self.X[index] = data
+        self.lookup[i, 0:len(data.shape)] = data.shape
+        self.bytesWritten += data.size * self.X.dtype.itemsize
+
+    def read(self, i):
+        if not self.isFilled(i):
+            return self.X[i, 0:0]
+        shape = self.lookup[i, 0:len(self.maxShape)]
+        index = (i, *(slice(0, a) for a in shape))
+        return self.X[index]
+
+    def checkpointLookup(self, wait=False):
+        self.X.flush()
+        return self.lookup.copy()
+
+    def invalidate(self, start, stop):
+        self.lookup[start:stop] = -1
+        self.rowIndex = None
+
+    def readRange(self, start, stop, step):
+        # The frames are already padded, rows past a frame's length are not defined.
+        lengths = np.maximum(self.lookup[start:stop:step, 0], 0).astype('int64')
+        return self.X[start:stop:step], lengths
+
+    def readAccumulated(self, i):
+        if self.rowIndex is None:
+            self.buildRowIndex()
+        rows = self.X.reshape(-1, *self.maxShape[1:])
+        return rows[self.rowIndex[0:self.cumulativeRows[i + 1]]]
+
+    def buildRowIndex(self):
+        # Flat row index of all stored rows in frame order, so that
+        # frames 0..i can be gathered with a single indexing operation.
+        n, maxLength = self.X.shape[0:2]
+        heights = np.maximum(self.lookup[:, 0], 0).astype('int64')
+        cumulativeRows = np.zeros(n + 1, 'int64')
+        np.cumsum(heights, out=cumulativeRows[1:])
+        frameStarts = np.arange(n, dtype='int64') * maxLength
+        self.rowIndex = (np.repeat(frameStarts - cumulativeRows[:-1], heights)
+                         + np.arange(cumulativeRows[-1], dtype='int64'))
+        self.cumulativeRows = cumulativeRows
+
+    def close(self):
+        if self.X is not None:
+            self.X.flush()
+        self.X = None
+        self.rowIndex = None
+
+class RaggedLayout:
+    '''
+    Frames are concatenated row by row and the lookup table is a prefix
+    offset table, frame i ends at the row `lookup[i + 1]`. Frames are
+    appended in order, so no maximum length is needed up front. Frames
+    that are written into a gap of unwritten frames move the frames
+    after the gap aside until the gap is filled.
+    '''
+    def __init__(self, fileName, meta, lookup, mode):
+        self.itemShape = tuple(meta['item_shape'])
+        self.dtype = np.dtype(meta['dtype'])
+        self.rowBytes = self.dtype.itemsize * int(np.prod(self.itemShape))
+        self.lookup = lookup
+        self.rowCount = max(int(lookup.max()), 0)
+        self.nextFrame = getNextFrame(lookup)
+        self.bytesWritten = 0
+        self.file = None
+        self.X = None
+        self.tail = None
+        if mode == 'r':
+            self.starts = getStartRows(lookup)
+            self.X = mapRows(fileName, self.dtype, self.itemShape, self.rowCount)
+        elif mode == 'r+':
+            # Rows written after the last checkpoint are not referenced by the lookup.
+            self.file = open(fileName, 'r+b')
+            self.file.truncate(self.rowCount * self.rowBytes)
+            self.file.seek(0, 2)
+        else:
+            # Rows after a gap are read back when the gap is written.
+            self.file = open(fileName, 'w+b')
+
+    @classmethod
+    def create(cls, fileName, meta, info):
+        meta['item_shape'] = getItemShape(meta['class_type'])
+        return cls(fileName, meta, getOffsets(meta['n']), 'w')
+
+    def isFilled(self, i):
+        if self.tail is not None and self.tail[0] <= i < self.tail[1]:
+            return self.tail[2][i - self.tail[0]] != -1
+        return self.lookup[i + 1] != -1
+
+    def insert(self, i, data):
+        assert data.shape[1:] == self.itemShape
+        if self.tail is not None and (i < self.nextFrame or i >= self.tail[0]):
+            self.restoreTail()
+        if i < self.nextFrame:
+            assert not self.isFilled(i)
+            self.invalidate(i, getNextWritten(self.lookup, i))
+
+        np.ascontiguousarray(data, dtype=self.dtype).tofile(self.file)
+        self.rowCount += data.shape[0]
+        self.bytesWritten += data.shape[0] * self.rowBytes
+        self.lookup[i + 1] = self.rowCount
+        self.nextFrame = i + 1
+
+        if self.tail is not None and self.nextFrame == self.tail[0]:
+            self.restoreTail()
+
+    def checkpointLookup(self, wait=False):
+        self.file.flush()
+        return self.lookup.copy()
+
+    def invalidate(self, start, stop):
+        if self.tail is not None:
+            self.restoreTail()
+        stop = min(stop, self.nextFrame)
+        if start >= stop:
+            return
+        self.file.flush()
+        if stop < self.nextFrame:
+            self.stashTail(stop)
+        self.lookup[start + 1:] = -1
+        self.nextFrame = getNextFrame(self.lookup)
+        self.rowCount = int(self.lookup[self.nextFrame])
+        self.file.truncate(self.rowCount * self.rowBytes)
+        self.file.seek(0, 2)
+
+    def stashTail(self, start):
+        # Frames after a re-baked range are moved aside and appended
+        # again once the range is written, since its length can change.
+        firstRow = int(self.lookup[0:start + 1].max())
+        ends = self.lookup[start + 1:self.nextFrame + 1]
+        offsets = np.where(ends == -1, -1, ends - firstRow)
+        tailFile = TemporaryFile()
+        self.file.seek(firstRow * self.rowBytes)
+        copyfileobj(self.file, tailFile)
+        self.tail = (start, self.nextFrame, offsets, tailFile)
+
+    def restoreTail(self):
+        # Frames between the written ones and the tail stay unwritten.
+        start, end, offsets, tailFile = self.tail
+        self.bytesWritten += tailFile.tell()
+        tailFile.seek(0)
+        copyfileobj(tailFile, self.file)
+        tailFile.close()
+        self.lookup[start + 1:end + 1] = np.where(offsets == -1, -1, offsets + self.rowCount)
+        self.rowCount = int(self.lookup[end])
+        self.nextFrame = end
+        self.tail = None
+
+    def read(self, i):
+        if not self.isFilled(i):
+            return self.X[0:0]
+        return self.X[self.starts[i]:self.lookup[i + 1]]
+
+    def readRange(self, start, stop, step):
+        # Consecutive frames of equal length are one contiguous block of rows.
+        offsets = self.lookup[start:stop + 1]
+        if step != 1 or len(offsets) < 2 or np.any(offsets == -1):
+            return None
+        lengths = np.diff(offsets)
+        if np.any(lengths != lengths[0]):
+            return None
+        block = self.X[offsets[0]:offsets[-1]]
+        return block.reshape(len(lengths), lengths[0], *self.itemShape), lengths
+
+    def readAccumulated(self, i):
+        # Rows are stored in frame order, frames 0..i are one contiguous slice.
+        return self.X[0:self.starts[i + 1]]
+
+    def close(self):
+        if self.file is not None:
+            if self.tail is not None:
+                self.restoreTail()
+            self.file.close()
+        self.file = None
+        self.X = None
+
+class CompressedLayout:
+    '''
+    Frames are grouped into chunks of `chunk_size` frames and every chunk
+    is compressed on its own. Column 0 of the lookup table is the prefix
+    row offset table of the ragged layout, column 1 holds the byte offset
+    of every chunk at its first frame and the end of the last chunk.
+    Only the chunk that contains the requested frame gets decompressed.
+    '''
+    def __init__(self, fileName, meta, lookup, mode):
+        self.itemShape = tuple(meta['item_shape'])
+        self.dtype = np.dtype(meta['dtype'])
+        self.chunkSize = meta['chunk_size']
+        self.codec = meta['codec']
+        self.level = meta['level']
+        self.n = meta['n']
+        self.lookup = lookup
+        self.rowCount = max(int(lookup[:, 0].max()), 0)
+        # Frames up to the end of the last chunk, chunks can end with unwritten frames.
+        self.nextFrame = int(np.flatnonzero(lookup[:, 1] != -1)[-1])
+        self.bytesWritten = 0
+        self.file = None
+        self.X = None
+        self.tail = None
+        self.chunkIndex = -1
+        self.chunk = None
+        if mode == 'r':
+            self.starts = getStartRows(lookup[:, 0])
+            self.chunkBounds = np.flatnonzero(lookup[:, 1] != -1)
+            self.X = mapRows(fileName, np.dtype('uint8'), (), max(int(lookup[:, 1].max()), 0))
+        else:
+            # Chunks are read back when frames are written into a gap.
+            self.file = open(fileName, 'r+b' if mode == 'r+' else 'w+b')
+            self.byteCount = int(lookup[self.nextFrame, 1])
+            # Chunks written after the last checkpoint are not referenced by the lookup.
+            self.file.truncate(self.byteCount)
+            self.file.seek(0, 2)
+            self.writtenFrames = self.nextFrame
+            self.pendingFrames = []
+            self.pendingChunks = deque()
+            self.workers = cpu_count() or 1
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+            if mode == 'r+' and self.nextFrame < self.n and self.nextFrame % self.chunkSize != 0:
+                # The last chunk is incomplete, its frames are appended to again.
+                end = self.nextFrame
+                chunkStart = end - end % self.chunkSize
+                self.appendFrames(chunkStart, end, *self.takeFrames(chunkStart))
+
+    @classmethod
+    def create(cls, fileName, meta, info):
+        meta['item_shape'] = getItemShape(meta['class_type'])
+        meta['codec'] = info.get('codec', "ZLIB")
+        meta['level'] = info.get('level', 6)
+        meta['chunk_size'] = max(1, info.get('chunk_size', 1))
+        lookup = np.ones((meta['n'] + 1, 2), 'int64') * -1
+        lookup[0] = 0
+        return cls(fileName, meta, lookup, 'w')
+
+    def isFilled(self, i):
+        if self.tail is not None and self.tail[0] <= i < self.tail[1]:
+            return self.tail[2][i - self.tail[0]] != -1
+        return self.lookup[i + 1, 0] != -1
+
+    def insert(self, i, data):
+        assert data.shape[1:] == self.itemShape
+        if self.tail is not None and (i < self.nextFrame or i >= self.tail[0]):
+            self.restoreTail()
+        if i < self.nextFrame:
+            assert not self.isFilled(i)
+            self.invalidate(i, getNextWritten(self.lookup[:, 0], i))
+
+        # Chunks hold every frame, frames that were skipped are stored empty and unwritten.
+        for j in range(self.nextFrame, i):
+            self.appendFrame(j, data[0:0], False)
+        self.appendFrame(i, data, True)
+
+        if self.tail is not None and self.nextFrame == self.tail[0]:
+            self.restoreTail()
+
+    def appendFrame(self, i, data, written):
+        self.pendingFrames.append(np.ascontiguousarray(data, dtype=self.dtype))
+        self.rowCount += data.shape[0]
+        self.lookup[i + 1, 0] = self.rowCount if written else -1
+        self.nextFrame = i + 1
+        if self.nextFrame % self.chunkSize == 0 or self.nextFrame == self.n:
+            self.submitChunk()
+
+    def submitChunk(self):
+        if len(self.pendingFrames) == 0:
+            return
+        chunkStart = self.nextFrame - len(self.pendingFrames)
+        data = np.concatenate(self.pendingFrames).tobytes()
+        future = self.executor.submit(compress, data, self.codec, self.level)
+        self.pendingChunks.append((chunkStart, self.nextFrame, future))
+        self.pendingFrames = []
+        # Back-pressure, don't keep more compressed chunks in memory than needed.
+        while len(self.pendingChunks) > 2 * self.workers:
+            self.writeChunk()
+
+    def writeChunk(self):
+        chunkStart, chunkEnd, future = self.pendingChunks.popleft()
+        data = future.result()
+        self.lookup[chunkStart, 1] = self.byteCount
+        self.file.write(data)
+        self.byteCount += len(data)
+        self.bytesWritten += len(data)
+        self.lookup[chunkEnd, 1] = self.byteCount
+        self.writtenFrames = chunkEnd
+
+    def checkpointLookup(self, wait=False):
+        # Frames that are still being compressed are not on disk yet, unless
+        # `wait` is set, then every complete chunk is written first.
+        while len(self.pendingChunks) > 0 and (wait or self.pendingChunks[0][2].done()):
+            self.writeChunk()
+        self.file.flush()
+        lookup = self.lookup.copy()
+        lookup[self.writtenFrames + 1:] = -1
+        return lookup
+
+    def invalidate(self, start, stop):
+        # Chunks can't change their size in place, so the chunks from the one
+        # that contains `start` on are decompressed. Its frames before `start`
+        # are appended again right away, the frames from `stop` on are moved
+        # aside and appended again once the range is written.
+        if self.tail is not None:
+            self.restoreTail()
+        stop = min(stop, self.nextFrame)
+        if start >= stop:
+            return
+        chunkStart = start - start % self.chunkSize
+        end = self.nextFrame
+        ends, starts, rows = self.takeFrames(chunkStart)
+        if stop < end:
+            tailFile = TemporaryFile()
+            tailFile.write(rows[starts[stop] - starts[chunkStart]:].tobytes())
+            offsets = np.where(ends[stop + 1:] == -1, -1, ends[stop + 1:] - starts[stop])
+            self.tail = (stop, end, offsets, tailFile)
+        # Unwritten frames at the end are not needed, they are filled when the next frame is written.
+        self.appendFrames(chunkStart, max(getNextFrame(ends[0:start + 1]), chunkStart), ends, starts, rows)
+
+    def takeFrames(self, chunkStart):
+        # Decompresses the frames from `chunkStart` on and removes them from the file.
+        self.submitChunk()
+        while len(self.pendingChunks) > 0:
+            self.writeChunk()
+        end = self.nextFrame
+        ends = self.lookup[0:end + 1, 0].copy()
+        rows = np.concatenate([self.readWrittenChunk(k, min(k + self.chunkSize, end))
+                               for k in range(chunkStart, end, self.chunkSize)])
+        self.discardFrom(chunkStart)
+        self.byteCount = int(self.lookup[chunkStart, 1])
+        self.writtenFrames = chunkStart
+        self.chunkIndex = -1
+        return ends, getStartRows(ends), rows
+
+    def appendFrames(self, start, stop, ends, starts, rows):
+        # `rows` start with the first row of the chunk that contains `start`.
+        firstRow = starts[start - start % self.chunkSize]
+        for j in range(start, stop):
+            self.appendFrame(j, rows[starts[j] - firstRow:starts[j + 1] - firstRow], ends[j + 1] != -1)
+
+    def restoreTail(self):
+        # Frames between the written ones and the tail stay unwritten.
+        start, end, offsets, tailFile = self.tail
+        self.tail = None
+        empty = np.zeros((0, *self.itemShape), dtype=self.dtype)
+        for j in range(self.nextFrame, start):
+            self.appendFrame(j, empty, False)
+        tailFile.seek(0)
+        rows = np.frombuffer(tailFile.read(), dtype=self.dtype).reshape(-1, *self.itemShape)
+        tailFile.close()
+        starts = getStartRows(np.concatenate(([0], offsets)))
+        for j in range(start, end):
+            k = j - start
+            self.appendFrame(j, rows[starts[k]:starts[k + 1]], offsets[k] != -1)
+
+    def readWrittenChunk(self, chunkStart, chunkEnd):
+        byteStart, byteEnd = int(self.lookup[chunkStart, 1]), int(self.lookup[chunkEnd, 1])
+        self.file.seek(byteStart)
+        data = decompress(self.file.read(byteEnd - byteStart), self.codec)
+        self.file.seek(0, 2)
+        return np.frombuffer(data, dtype=self.dtype).reshape(-1, *self.itemShape)
+
+    def discardFrom(self, start):
+        self.lookup[start + 1:] = -1
+        self.rowCount = int(self.lookup[0:start + 1, 0].max())
+        self.nextFrame = start
+        self.file.truncate(int(self.lookup[start, 1]))
+        self.file.seek(0, 2)
+
+    def read(self, i):
+        if not self.isFilled(i):
+            return np.zeros((0, *self.itemShape), dtype=self.dtype)
+        chunkStart = i - i % self.chunkSize
+        chunk = self.loadChunk(chunkStart)
+        firstRow = self.starts[chunkStart]
+        return chunk[self.starts[i] - firstRow:self.lookup[i + 1, 0] - firstRow]
+
+    def readAccumulated(self, i):
+        end = min(i + 1, self.nextFrame)
+        chunks = [self.loadChunk(start) for start in range(0, end, self.chunkSize)]
+        if len(chunks) == 0:
+            return np.zeros((0, *self.itemShape), dtype=self.dtype)
+        return np.concatenate(chunks)[0:self.starts[end]]
+
+    def loadChunk(self, chunkStart):
+        if self.chunkIndex != chunkStart:
+            # The last written frame of a live bake can be in the middle of a chunk.
+            chunkEnd = self.chunkBounds[np.searchsorted(self.chunkBounds, chunkStart, 'right')]
+            data = decompress(self.X[self.lookup[chunkStart, 1]:self.lookup[chunkEnd, 1]], self.codec)
+            self.chunk = np.frombuffer(data, dtype=self.dtype).reshape(-1, *self.itemShape)
+            self.chunkIndex = chunkStart
+        return self.chunk
+
+    def close(self):
+        if self.file is not None:
+            if self.tail is not None:
+                self.restoreTail()
+            self.submitChunk()
+            while len(self.pendingChunks) > 0:
+                self.writeChunk()
+            self.executor.shutdown()
+            self.file.close()
+        self.file = None
+        self.X = None
+        self.chunk = None
+        self.chunkIndex = -1
+
+def compress(data, codec, level):
+    if codec == "ZLIB":
+        return zlib.compress(data, level)
+    elif codec == "LZMA":
+        return lzma.compress(data, preset=level)
+    raise ValueError("Unknown codec " + codec)
+
+def decompress(data, codec):
+    if codec == "ZLIB":
+        return zlib.decompress(data)
+    elif codec == "LZMA":
+        return lzma.decompress(data)
+    raise ValueError("Unknown codec " + codec)
+
+layouts = {
+    "PADDED": PaddedLayout,
+    "RAGGED": RaggedLayout,
+    "COMPRESSED": CompressedLayout
+}
+
+def mapRows(fileName, dtype, itemShape, rowCount):
+    if rowCount == 0:
+        return np.zeros((0, *itemShape), dtype=dtype)
+    return np.memmap(fileName, shape=(rowCount, *itemShape), dtype=dtype, mode='r')
 
 # Write to Disk
 
 class Writer:
+    '''
+    With `mode` set to "APPEND" in the info an existing cache with the
+    same type and frame range is reopened instead of being recreated.
+    Filled frames can then be skipped (`isFilled`) or re-baked after
+    `invalidate`. With a `checkpoint_interval` the lookup table is saved
+    every n frames, so an interrupted bake can be resumed. With `live`
+    every written frame is committed to a journal that readers apply
+    to the lookup table, so a cache can be played while it is baked.
+    '''
     def __init__(self, fileName, info={}):
         n = info.get('n')
         assert n > 0
-
-        name = fileName[0:-4] if fileName.endswith('.npy') else fileName
-        lookupFile = name + '_lookup.npy'
-        metaFile = name + '_meta.json'
+        closeReader(fileName)
+        fileName, lookupFile, metaFile = getCacheFiles(fileName)
 
         classType = info.get('class_type')
-        dtype = getDtype(classType)
-        maxShape = getMaxShape(classType, info.get('max_length'))
-        shape = (n, *maxShape)
-        meta = {
-            "max_shape": maxShape,
-            "n": n,
-            "dtype": dtype,
-            "class_type": classType,
-            "start_frame": info.get('start_frame'),
-            "end_frame": info.get('end_frame')
-        }
-        with open(metaFile, 'w+') as f:
-            metaDmp = json.dumps(meta)
-            f.write(metaDmp)
-
-        currentPointer = 0
-        X = np.memmap(fileName, shape=shape, dtype=dtype, mode='w+')
+        if info.get('mode', "WRITE") == "APPEND" and all(isfile(path) for path in (fileName, lookupFile, metaFile)):
+            meta = readMeta(metaFile)
+            for key, value in (("class_type", classType), ("n", n), ("start_frame", info.get('start_frame'))):
+                if meta[key] != value:
+                    raise ValueError(f"Existing cache has a different {key}: {meta[key]}")
+            self.encoding = getEncoding(meta)
+            self.layout = layouts[meta['layout']](fileName, meta, loadLookup(fileName), 'r+')
+        else:
+            layout = info.get('layout', "PADDED")
+            encoding = info.get('encoding', "NONE") if classType in encodableTypes else "NONE"
+            meta = {
+                "version": FORMAT_VERSION,
+                "layout": layout,
+                "encoding": encoding,
+                "keyframe_interval": info.get('keyframe_interval', 10),
+                "n": n,
+                "dtype": getDtype(classType),
+                "class_type": classType,
+                "start_frame": info.get('start_frame'),
+                "end_frame": info.get('end_frame')
+            }
+            self.encoding = getEncoding(meta)
+            meta['dtype'] = self.encoding.getStoredDtype(meta['dtype'])
+            if info.get('max_length') is not None:
+                info = dict(info, max_length=info['max_length'] + self.encoding.headerRows)
+            self.layout = layouts[layout].create(fileName, meta, info)
+            writeMeta(metaFile, meta)
+            saveLookup(lookupFile, self.layout.lookup)
 
-        self.currentPointer = currentPointer
-        self.lookup = getLookup(classType, n)
+        self.currentPointer = 0
+        self.checkpointInterval = info.get('checkpoint_interval', 0)
+        self.framesSinceCheckpoint = 0
         self.metaFile = metaFile
         self.lookupFile = lookupFile
-        self.X = X
-        self.maxShape = maxShape
         self.n = n
         self.classType = classType
+        self.openJournal(fileName, info.get('live', False))
 
     def add(self, data):
+        self.addArray(dataToArray(data, self.classType))
+
+    def addArray(self, data):
         if self.currentPointer < 0:
             raise BufferError("out of bounds")
         assert self.currentPointer < self.n
 
-        data = dataToArray(data, self.classType)
         self.insert(self.currentPointer, data)
         curp = self.currentPointer + 1
         self.currentPointer = curp if curp < self.n else -1
 
+    def write(self, i, data):
+        self.insert(i, dataToArray(data, self.classType))
+
+    @staticmethod
+    def snapshot(data):
+        return np.array(data.asNumpyArray())
+
+    def insertSnapshot(self, i, buffer):
+        if i is None:
+            self.addArray(bufferToArray(buffer, self.classType))
+        else:
+            self.insert(i, bufferToArray(buffer, self.classType))
+
     def insert(self, i, data):
         assert i < self.n
-        assert self.lookup[i, 0] == -1 and self.lookup[i, 1] == -1
-        assert len(data.shape) == len(self.maxShape)
-        for a, b in zip(data.shape, self.maxShape):
-            assert a <= b
+        self.layout.insert(i, self.encoding.encode(i, data))
+        self.frameWritten()
+
+    def frameWritten(self):
+        if self.live:
+            self.commit()
+        self.framesSinceCheckpoint += 1
+        if self.checkpointInterval > 0 and self.framesSinceCheckpoint >= self.checkpointInterval:
+            self.checkpoint()
+
+    def isFilled(self, i):
+        return self.layout.isFilled(i)
+
+    def isLocked(self, i):
+        return False
+
+    @property
+    def bytesWritten(self):
+        return self.layout.bytesWritten
+
+    def invalidate(self, start, stop):
+        stop = self.encoding.getInvalidationEnd(stop)
+        self.layout.invalidate(start, min(stop, self.n))
+        if self.live:
+            self.commit()
+
+    def openJournal(self, fileName, live):
+        # A journal left by an interrupted live bake is merged into the lookup table.
+        self.journalFile = getJournalFile(fileName)
+        if isfile(self.journalFile):
+            saveLookup(self.lookupFile, self.layout.checkpointLookup())
+            remove(self.journalFile)
+        self.live = live
+        if live:
+            self.committedLookup = self.layout.checkpointLookup()
+            saveLookup(self.lookupFile, self.committedLookup)
+            open(self.journalFile, 'wb').close()
+
+    def commit(self):
+        # Appends the lookup rows that changed since the last commit, the data
+        # of these rows is flushed by `checkpointLookup` before. A compressed
+        # chunk is committed as soon as its last frame is written.
+        lookup = self.layout.checkpointLookup(wait=True)
+        changed = np.flatnonzero(np.any((lookup != self.committedLookup).reshape(len(lookup), -1), axis=1))
+        if len(changed) == 0:
+            return
+        records = np.concatenate((changed[:, None], lookup[changed].reshape(len(changed), -1)), axis=1)
+        with open(self.journalFile, 'ab') as f:
+            f.write(records.astype('int64').tobytes())
+        self.committedLookup = lookup
 
-        if self.classType in type1List:
-            h, = data.shape
-            self.X[i, 0:h] = data
-            self.lookup[i, 0] = h
-        elif self.classType in type2List:
-            h, w = data.shape
-            self.X[i, 0:h, 0:w] = data
-            self.lookup[i, 0] = h
-            self.lookup[i, 1] = w
-        elif self.classType == "MATRIX":
-            h, w, c = data.shape
-            self.X[i, 0:h, 0:w, 0:c] = data
-            self.lookup[i, 0] = h
-            self.lookup[i, 1] = w
-            self.lookup[i, 2] = c
+    def checkpoint(self):
+        saveLookup(self.lookupFile, self.layout.checkpointLookup())
+        self.framesSinceCheckpoint = 0
 
     def flush(self):
-        if self.X is not None:
-            del self.X
-        try:
-            remove(self.lookupFile)
-            sleep(0.01)
-        except:
-            pass
-        np.save(self.lookupFile, self.lookup)
+        self.layout.close()
+        saveLookup(self.lookupFile, self.layout.lookup)
+        if self.live and isfile(self.journalFile):
+            remove(self.journalFile)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+class ChannelWriter(Writer):
+    '''
+    Writes several named channels, each with its own class type, into one
+    container. Channel c of frame i is stored as the byte segment
+    `i * channelCount + c` of a ragged layout, so all channels share one
+    frame index. `write` and `insert` take one list/array per channel.
+    '''
+    def __init__(self, fileName, info={}):
+        n = info.get('n')
+        assert n > 0
+        closeReader(fileName)
+        fileName, lookupFile, metaFile = getCacheFiles(fileName)
+
+        channels = [{"name": name, "class_type": classType} for name, classType in info.get('channels')]
+        assert len(channels) > 0
+        if info.get('mode', "WRITE") == "APPEND" and all(isfile(path) for path in (fileName, lookupFile, metaFile)):
+            meta = readMeta(metaFile)
+            for key, value in (("channels", channels), ("n", n), ("start_frame", info.get('start_frame'))):
+                if meta.get(key) != value:
+                    raise ValueError(f"Existing cache has a different {key}: {meta.get(key)}")
+            self.layout = RaggedLayout(fileName, segmentMeta, loadLookup(fileName), 'r+')
+        else:
+            meta = {
+                "version": FORMAT_VERSION,
+                "layout": "CHANNELS",
+                "n": n,
+                "channels": channels,
+                "class_type": "CHANNELS",
+                "start_frame": info.get('start_frame'),
+                "end_frame": info.get('end_frame')
+            }
+            self.layout = RaggedLayout(fileName, segmentMeta, getOffsets(n * len(channels)), 'w')
+            writeMeta(metaFile, meta)
+            saveLookup(lookupFile, self.layout.lookup)
+
+        self.currentPointer = 0
+        self.checkpointInterval = info.get('checkpoint_interval', 0)
+        self.framesSinceCheckpoint = 0
+        self.metaFile = metaFile
+        self.lookupFile = lookupFile
+        self.n = n
+        self.classTypes = [channel['class_type'] for channel in channels]
+        self.channelCount = len(channels)
+        self.openJournal(fileName, info.get('live', False))
+
+    def add(self, dataList):
+        self.addArray([dataToArray(data, classType) for data, classType in zip(dataList, self.classTypes)])
+
+    def write(self, i, dataList):
+        self.insert(i, [dataToArray(data, classType) for data, classType in zip(dataList, self.classTypes)])
+
+    @staticmethod
+    def snapshot(dataList):
+        return [np.array(data.asNumpyArray()) for data in dataList]
+
+    def insertSnapshot(self, i, buffers):
+        arrays = [bufferToArray(buffer, classType) for buffer, classType in zip(buffers, self.classTypes)]
+        if i is None:
+            self.addArray(arrays)
+        else:
+            self.insert(i, arrays)
+
+    def insert(self, i, arrays):
+        assert i < self.n
+        assert len(arrays) == self.channelCount
+        # A frame whose writing failed after some channels is written again.
+        if self.layout.isFilled(i * self.channelCount):
+            self.layout.invalidate(i * self.channelCount, (i + 1) * self.channelCount)
+        for c, array in enumerate(arrays):
+            self.layout.insert(i * self.channelCount + c, np.ascontiguousarray(array).view('uint8').reshape(-1))
+        self.frameWritten()
+
+    def isFilled(self, i):
+        return all(self.layout.isFilled(i * self.channelCount + c) for c in range(self.channelCount))
+
+    def invalidate(self, start, stop):
+        self.layout.invalidate(start * self.channelCount, min(stop, self.n) * self.channelCount)
+        if self.live:
+            self.commit()
+
+class MeshWriter(Writer):
+    '''
+    Stores the vertex positions of a mesh per frame like a vector list.
+    Edges and polygons are stored once per distinct topology in the
+    `_topology.npz` file, every frame only refers to a topology id.
+    Commits and checkpoints append the new topologies and the changed
+    ids to a topology journal, the npz file is only written on flush.
+    '''
+    def __init__(self, fileName, info={}):
+        super().__init__(fileName, info)
+        self.topologyFile = getTopologyFile(fileName)
+        self.topologyJournalFile = getTopologyJournalFile(fileName)
+        self.topologyIds = np.ones(self.n, 'int32') * -1
+        self.topologies = []
+        self.topologyHashes = {}
+        if info.get('mode', "WRITE") == "APPEND" and isfile(self.topologyFile):
+            self.topologyIds, self.topologies = loadTopologies(fileName)
+            self.topologyIds = self.topologyIds.copy()
+            for k, topology in enumerate(self.topologies):
+                self.topologyHashes[hashTopology(*topology)] = k
+        # A journal left by an interrupted bake is merged into the npz file.
+        saveTopologies(self.topologyFile, self.topologyIds, self.topologies)
+        open(self.topologyJournalFile, 'wb').close()
+        self.savedTopologies = len(self.topologies)
+        self.changedIds = set()
+
+    @staticmethod
+    def snapshot(mesh):
+        polygons = mesh.polygons
+        return (np.array(mesh.vertices.asNumpyArray()),
+                np.array(mesh.edges.asNumpyArray()),
+                np.array(polygons.indices.asNumpyArray()),
+                np.array(polygons.polyStarts.asNumpyArray()),
+                np.array(polygons.polyLengths.asNumpyArray()))
+
+    def insertSnapshot(self, i, snapshot):
+        if i is None:
+            if self.currentPointer < 0:
+                raise BufferError("out of bounds")
+            i = self.currentPointer
+            self.currentPointer = i + 1 if i + 1 < self.n else -1
+        self.insertMesh(i, bufferToArray(snapshot[0], "VECTOR"), snapshot[1:])
+
+    def add(self, mesh):
+        self.insertSnapshot(None, self.snapshot(mesh))
+
+    def write(self, i, mesh):
+        self.insertSnapshot(i, self.snapshot(mesh))
+
+    def insertMesh(self, i, vertices, topology):
+        topology = tuple(np.asarray(array, 'uint32') for array in topology)
+        key = hashTopology(*topology)
+        topologyId = self.topologyHashes.get(key)
+        if topologyId is None:
+            topologyId = len(self.topologies)
+            self.topologies.append(topology)
+            self.topologyHashes[key] = topologyId
+        self.topologyIds[i] = topologyId
+        self.changedIds.add(i)
+        self.insert(i, vertices)
+
+    def invalidate(self, start, stop):
+        end = min(self.encoding.getInvalidationEnd(stop), self.n)
+        self.topologyIds[start:end] = -1
+        self.changedIds.update(range(start, end))
+        super().invalidate(start, stop)
+
+    def saveTopologyChanges(self):
+        # Topologies have to be visible before the frames that use them.
+        if self.savedTopologies == len(self.topologies) and not self.changedIds:
+            return
+        appendTopologies(self.topologyJournalFile, self.topologies[self.savedTopologies:],
+                         self.changedIds, self.topologyIds)
+        self.savedTopologies = len(self.topologies)
+        self.changedIds.clear()
+
+    def commit(self):
+        self.saveTopologyChanges()
+        super().commit()
+
+    def checkpoint(self):
+        self.saveTopologyChanges()
+        super().checkpoint()
+
+    def flush(self):
+        saveTopologies(self.topologyFile, self.topologyIds, self.topologies)
+        if isfile(self.topologyJournalFile):
+            remove(self.topologyJournalFile)
+        self.savedTopologies = len(self.topologies)
+        self.changedIds.clear()
+        super().flush()
+
+def hashTopology(edges, indices, polyStarts, polyLengths):
+    topologyHash = hashlib.blake2b(digest_size=16)
+    for array in (edges, indices, polyStarts, polyLengths):
+        topologyHash.update(len(array).to_bytes(8, 'little'))
+        topologyHash.update(np.ascontiguousarray(array, 'uint32').tobytes())
+    return topologyHash.digest()
+
+def saveTopologies(topologyFile, topologyIds, topologies):
+    arrays = {"ids": topologyIds}
+    for k, topology in enumerate(topologies):
+        for name, array in zip(("edges", "indices", "starts", "lengths"), topology):
+            arrays[f"{name}_{k}"] = array
+    tempFile = topologyFile + '.tmp'
+    with open(tempFile, 'wb') as f:
+        np.savez(f, **arrays)
+    replace(tempFile, topologyFile)
+
+def appendTopologies(journalFile, newTopologies, changedIds, topologyIds):
+    '''
+    A topology journal record is a header array with the number of new
+    topologies and changed ids, the four arrays of every new topology and
+    the (frame, id) pairs. Records are written with a single write.
+    '''
+    frames = np.array(sorted(changedIds), 'int64')
+    changes = np.stack((frames, topologyIds[frames].astype('int64')), axis=1)
+    buffer = BytesIO()
+    np.save(buffer, np.array([len(newTopologies), len(changes)], 'int64'))
+    for topology in newTopologies:
+        for array in topology:
+            np.save(buffer, array)
+    np.save(buffer, changes)
+    with open(journalFile, 'ab') as f:
+        f.write(buffer.getvalue())
+
+def loadTopologies(fileName):
+    with np.load(getTopologyFile(fileName)) as arrays:
+        topologyIds = arrays["ids"]
+        topologies = []
+        while f"edges_{len(topologies)}" in arrays:
+            k = len(topologies)
+            topologies.append(tuple(arrays[f"{name}_{k}"] for name in ("edges", "indices", "starts", "lengths")))
+    journalFile = getTopologyJournalFile(fileName)
+    if isfile(journalFile):
+        topologyIds = topologyIds.copy()
+        with open(journalFile, 'rb') as f:
+            # An incomplete last record of a running bake is ignored.
+            while True:
+                try:
+                    topologyCount, changeCount = np.load(f)
+                    newTopologies = [tuple(np.load(f) for _ in range(4)) for _ in range(topologyCount)]
+                    changes = np.load(f)
+                except (ValueError, EOFError, OSError):
+                    break
+                topologies.extend(newTopologies)
+                topologyIds[changes[:, 0]] = changes[:, 1]
+    return topologyIds, topologies
+
+def getShardFile(fileName, k):
+    name = fileName[0:-4] if fileName.endswith('.npy') else fileName
+    return name + f'_shard{k:05d}.npy'
+
+def getShardLockFile(fileName, k):
+    return getShardFile(fileName, k)[0:-4] + '.lock'
+
+def lockFile(path):
+    '''
+    Takes an exclusive lock on the file, returns the open file or None when
+    another process holds the lock. Closing the file, or the end of the
+    process, releases it.
+    '''
+    f = open(path, 'a+b')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+class ShardedWriter:
+    '''
+    Splits the frames into shards of `shard_size` frames. Every shard is a
+    regular cache of its own and is created once its first frame is
+    written, the manifest only stores the shard size and the frame range.
+    A shard is locked by the first writer that checks or writes one of its
+    frames and stays locked until the writer is flushed. Frames of shards
+    that another process has locked are skipped with `isLocked`, so bakes
+    of the same cache in separate processes split the shards between them,
+    `isFilled` is only true for written frames. Only the
+    shard that is currently written is kept open.
+    '''
+    def __init__(self, fileName, info={}):
+        n = info.get('n')
+        shardSize = info.get('shard_size')
+        assert n > 0 and shardSize > 0
+        closeReader(fileName)
+        fileName, lookupFile, metaFile = getCacheFiles(fileName)
+
+        meta = {
+            "version": FORMAT_VERSION,
+            "layout": "SHARDED",
+            "shard_size": shardSize,
+            "n": n,
+            "class_type": info.get('class_type'),
+            "start_frame": info.get('start_frame'),
+            "end_frame": info.get('end_frame')
+        }
+        self.fileName = fileName
+        self.locks = {}
+        self.mode = info.get('mode', "WRITE")
+        if self.mode == "APPEND" and isfile(metaFile):
+            oldMeta = readMeta(metaFile)
+            for key in ("layout", "shard_size", "n", "class_type", "start_frame"):
+                if oldMeta.get(key) != meta[key]:
+                    raise ValueError(f"Existing cache has a different {key}: {oldMeta.get(key)}")
+        else:
+            if isfile(metaFile):
+                self.removeShards(readMeta(metaFile))
+            writeMeta(metaFile, meta)
+        if not isfile(fileName):
+            open(fileName, 'wb').close()
+            saveLookup(lookupFile, np.zeros(0, 'int64'))
+
+        self.info = info
+        self.n = n
+        self.shardSize = shardSize
+        self.classType = meta['class_type']
+        self.writerType = MeshWriter if self.classType == "MESH" else Writer
+        self.writers = {}
+        self.closedBytes = 0
+        self.lock = Lock()
+        self.currentPointer = 0
+
+    def removeShards(self, oldMeta):
+        # Shards of the old cache would still be read if they are not written again.
+        if oldMeta.get('layout') != "SHARDED":
+            return
+        for k in range((oldMeta['n'] - 1) // oldMeta['shard_size'] + 1):
+            shardFile = getShardFile(self.fileName, k)
+            if not isfile(shardFile):
+                continue
+            if not self.claimShard(k):
+                raise BlockingIOError(f"Shard {k} is baked by another process, use Resume to bake the remaining shards")
+            closeReader(shardFile)
+            for path in (*getCacheFiles(shardFile), getTopologyFile(shardFile),
+                         getTopologyJournalFile(shardFile), getJournalFile(shardFile)):
+                if isfile(path):
+                    remove(path)
+            self.locks.pop(k).close()
+
+    def getShardRange(self, k):
+        return k * self.shardSize, min((k + 1) * self.shardSize, self.n)
+
+    def claimShard(self, k):
+        if k not in self.locks:
+            f = lockFile(getShardLockFile(self.fileName, k))
+            if f is None:
+                return False
+            self.locks[k] = f
+        return True
+
+    def getShard(self, k):
+        writer = self.writers.get(k)
+        if writer is None:
+            if not self.claimShard(k):
+                raise BlockingIOError(f"Shard {k} is baked by another process")
+            start, stop = self.getShardRange(k)
+            startFrame = self.info.get('start_frame') + start
+            # Old shards are removed by a new bake, so an existing shard has been claimed before.
+            shardInfo = dict(self.info, n=stop - start, start_frame=startFrame,
+                             end_frame=startFrame + stop - start - 1, mode="APPEND")
+            writer = self.writerType(getShardFile(self.fileName, k), shardInfo)
+            self.writers[k] = writer
+        return writer
+
+    def closeShard(self, k):
+        writer = self.writers.pop(k)
+        writer.flush()
+        self.closedBytes += writer.bytesWritten
+
+    @property
+    def bytesWritten(self):
+        with self.lock:
+            return self.closedBytes + sum(writer.bytesWritten for writer in self.writers.values())
+
+    def isFilled(self, i):
+        # The state of a shard is only read after it is locked, no other process can change it then.
+        k = i // self.shardSize
+        with self.lock:
+            writer = self.writers.get(k)
+            if writer is None:
+                if not self.claimShard(k):
+                    return False
+                writer = self.getShard(k)
+            return writer.isFilled(i - k * self.shardSize)
+
+    def isLocked(self, i):
+        # Frames of a shard that another process has locked are baked by that process.
+        with self.lock:
+            return not self.claimShard(i // self.shardSize)
+
+    def add(self, data):
+        self.insertSnapshot(None, self.snapshot(data))
+
+    def write(self, i, data):
+        self.insertSnapshot(i, self.snapshot(data))
+
+    def snapshot(self, data):
+        return self.writerType.snapshot(data)
+
+    def insertSnapshot(self, i, snapshot):
+        if i is None:
+            if self.currentPointer < 0:
+                raise BufferError("out of bounds")
+            i = self.currentPointer
+            self.currentPointer = i + 1 if i + 1 < self.n else -1
+        assert i < self.n
+        k = i // self.shardSize
+        with self.lock:
+            for other in [other for other in self.writers if other != k]:
+                self.closeShard(other)
+            writer = self.getShard(k)
+        writer.insertSnapshot(i - k * self.shardSize, snapshot)
+
+    def invalidate(self, start, stop):
+        stop = min(stop, self.n)
+        with self.lock:
+            for k in range(start // self.shardSize, (stop - 1) // self.shardSize + 1):
+                shardStart, shardStop = self.getShardRange(k)
+                self.getShard(k).invalidate(max(start, shardStart) - shardStart, min(stop, shardStop) - shardStart)
+
+    def checkpoint(self):
+        with self.lock:
+            for writer in self.writers.values():
+                writer.checkpoint()
+
+    def flush(self):
+        with self.lock:
+            for k in list(self.writers.keys()):
+                self.closeShard(k)
+            for k in list(self.locks.keys()):
+                self.locks.pop(k).close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+def openWriter(fileName, info={}):
+    if info.get('shard_size', 0) > 0:
+        return ShardedWriter(fileName, info)
+    if info.get('class_type') == "MESH":
+        return MeshWriter(fileName, info)
+    return Writer(fileName, info)
+
+# Channel segments are stored as raw bytes.
+segmentMeta = {"item_shape": [], "dtype": "uint8"}
+
+class AsyncWriter:
+    '''
+    Moves list conversion, encoding and disk writes of a Writer to a
+    background thread, so that the next frame can be evaluated while the
+    previous one is written. `add` only snapshots the list buffer and
+    blocks while `queueSize` frames are waiting. Errors of the writer
+    thread are raised when the writer is flushed. The layout state is
+    only changed and read while `lock` is held.
+    '''
+    def __init__(self, writer, queueSize=8):
+        self.writer = writer
+        self.lock = Lock()
+        self.queue = Queue(maxsize=queueSize)
+        self.error = None
+        self.thread = Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def add(self, data):
+        self.write(None, data)
+
+    def write(self, i, data):
+        if self.error is None:
+            self.queue.put((i, self.writer.snapshot(data)))
+
+    def work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                with self.lock:
+                    self.writer.insertSnapshot(*item)
+            except Exception as e:
+                self.error = e
+
+    def isFilled(self, i):
+        with self.lock:
+            return self.writer.isFilled(i)
+
+    def isLocked(self, i):
+        with self.lock:
+            return self.writer.isLocked(i)
+
+    @property
+    def bytesWritten(self):
+        # Bytes of the encoded and compressed frames that are on disk.
+        with self.lock:
+            return self.writer.bytesWritten
+
+    def flush(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.flush()
+        if self.error is not None:
+            raise self.error
 
     def __enter__(self):
         return self
@@ -185,42 +1322,384 @@ class Writer:
 class Reader:
     def __init__(self, fileName, classType="VECTOR"):
         assert isfile(fileName)
-        name = fileName[0:-4] if fileName.endswith('.npy') else fileName
-        lookupFile = name + '_lookup.npy'
+        fileName, lookupFile, metaFile = getCacheFiles(fileName)
         assert isfile(lookupFile)
-        metaFile = name + '_meta.json'
         assert isfile(metaFile)
-        lookup = np.load(lookupFile)
+        lookup = loadLookup(fileName)
+        meta = readMeta(metaFile)
 
-        with open(metaFile, 'r') as f:
-            meta = json.loads(''.join(f.readlines()))
+        self.layout = layouts[meta['layout']](fileName, meta, lookup, 'r')
+        self.encoding = getEncoding(meta)
+        self.classType = meta['class_type']
+        self.startFrame = meta['start_frame']
+        self.endFrame = meta['end_frame']
+        self.n = meta['n']
+        self.prefetcher = None
+        # Layouts and encodings keep state, every read of them holds this lock.
+        self.lock = Lock()
 
-        n = meta['n']
-        maxShape = meta['max_shape']
-        dtype = meta['dtype']
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return arrayToData(self.read(item), self.classType)
+        else:
+            raise ValueError("Cannot get ", item)
 
-        shape = (n, *maxShape)
-        X = np.memmap(fileName, shape=shape, dtype=dtype, mode='r')
-        self.X = X
-        self.lookup = lookup
+    def read(self, i):
+        if self.prefetcher is not None:
+            return self.prefetcher.get(i)
+        return self.decode(i)
+
+    def decode(self, i):
+        with self.lock:
+            return self.encoding.decode(i, self.layout.read(i), self.layout.read)
+
+    def setPrefetch(self, distance, capacity=None):
+        '''Read the next `distance` frames in play direction ahead, 0 disables prefetching.'''
+        if distance <= 0:
+            if self.prefetcher is not None:
+                self.prefetcher.stop()
+                self.prefetcher = None
+            return
+        capacity = max(capacity or 2 * distance + 2, distance + 1)
+        if self.prefetcher is None:
+            self.prefetcher = Prefetcher(self, distance, capacity)
+        else:
+            self.prefetcher.distance = distance
+            self.prefetcher.capacity = capacity
+
+    def accumulate(self, i):
+        if self.encoding.isFramewise:
+            array = np.concatenate([self.read(j) for j in range(i + 1)])
+        else:
+            with self.lock:
+                array = self.encoding.decode(i, self.layout.readAccumulated(i), self.layout.read)
+        return arrayToData(array, self.classType)
+
+    def readRange(self, start, stop, step=1):
+        '''
+        Returns the frames `start:stop:step` as one (frames, points, ...) array
+        and the length of every frame. Rows past a frame's length are zero or,
+        when the array is a view of the cache, not defined.
+        '''
+        start, stop = max(start, 0), min(stop, self.n)
+        if start >= stop:
+            return np.zeros((0, 0, *getItemShape(self.classType)), getDtype(self.classType)), np.zeros(0, 'int64')
+        if self.layout is not None and self.encoding.isIdentity and hasattr(self.layout, "readRange"):
+            with self.lock:
+                result = self.layout.readRange(start, stop, step)
+            if result is not None:
+                return result
+        return padFrames([self.read(i) for i in range(start, stop, step)])
+
+    def interpolate(self, i, t):
+        '''Blend frame i and i + 1 by the factor t.'''
+        if t <= 0 or i + 1 >= self.n:
+            return self[i]
+        array = interpolateFrames(self.read(i), self.read(i + 1), t, self.classType)
+        return arrayToData(array, self.classType)
+
+    def close(self):
+        self.setPrefetch(0)
+        self.layout.close()
+
+def padFrames(frames):
+    lengths = np.array([len(frame) for frame in frames], 'int64')
+    block = np.zeros((len(frames), lengths.max(), *frames[0].shape[1:]), frames[0].dtype)
+    for k, frame in enumerate(frames):
+        block[k, 0:len(frame)] = frame
+    return block, lengths
+
+class Prefetcher:
+    '''
+    Decodes the frames following the last requested frame on a worker
+    thread into a bounded LRU, so playback doesn't wait for the disk.
+    The play direction is taken from the last two requests. Decoding
+    is serialized by the lock of the reader.
+    '''
+    def __init__(self, reader, distance, capacity):
+        self.reader = reader
+        self.distance = distance
+        self.capacity = capacity
+        self.frames = OrderedDict()
+        self.wanted = deque()
+        self.condition = Condition()
+        self.lastIndex = None
+        self.direction = 1
+        self.hits = 0
+        self.misses = 0
+        self.running = True
+        self.thread = Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def get(self, i):
+        with self.condition:
+            array = self.frames.get(i)
+            if array is not None:
+                self.frames.move_to_end(i)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if array is None:
+            array = self.load(i)
+        with self.condition:
+            self.request(i)
+        return array
+
+    def request(self, i):
+        if self.lastIndex is not None and i != self.lastIndex:
+            self.direction = 1 if i > self.lastIndex else -1
+        self.lastIndex = i
+        self.wanted.clear()
+        for k in range(1, self.distance + 1):
+            j = i + k * self.direction
+            if 0 <= j < self.reader.n and j not in self.frames:
+                self.wanted.append(j)
+        self.condition.notify()
+
+    def load(self, i):
+        array = np.array(self.reader.decode(i))
+        with self.condition:
+            self.frames[i] = array
+            while len(self.frames) > self.capacity:
+                self.frames.popitem(last=False)
+        return array
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.running and not self.wanted:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                j = self.wanted.popleft()
+                if j in self.frames:
+                    continue
+            self.load(j)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+class ChannelReader:
+    def __init__(self, fileName):
+        assert isfile(fileName)
+        fileName, lookupFile, metaFile = getCacheFiles(fileName)
+        assert isfile(lookupFile)
+        assert isfile(metaFile)
+        lookup = loadLookup(fileName)
+        meta = readMeta(metaFile)
+
+        self.layout = RaggedLayout(fileName, segmentMeta, lookup, 'r')
+        self.channels = {channel['name']: (c, channel['class_type']) for c, channel in enumerate(meta['channels'])}
+        self.channelCount = len(meta['channels'])
         self.classType = meta['class_type']
         self.startFrame = meta['start_frame']
         self.endFrame = meta['end_frame']
-        self.n = n
+        self.n = meta['n']
+
+    def getClassType(self, name):
+        return self.channels[name][1]
+
+    def read(self, i, name):
+        c, classType = self.channels[name]
+        segment = self.layout.read(i * self.channelCount + c)
+        return segment.view(getDtype(classType)).reshape(-1, *getItemShape(classType))
+
+    def get(self, i, name):
+        return arrayToData(self.read(i, name), self.getClassType(name))
+
+    def interpolate(self, i, t, name):
+        '''Blend frame i and i + 1 of the channel by the factor t.'''
+        if t <= 0 or i + 1 >= self.n:
+            return self.get(i, name)
+        classType = self.getClassType(name)
+        array = interpolateFrames(self.read(i, name), self.read(i + 1, name), t, classType)
+        return arrayToData(array, classType)
+
+    def close(self):
+        self.layout.close()
+
+class MeshReader(Reader):
+    '''
+    Builds meshes from the stored vertex positions and the topology of
+    the frame. Meshes of frames with the same topology share their
+    edge and polygon lists.
+    '''
+    def __init__(self, fileName):
+        super().__init__(fileName)
+        self.topologyIds, self.topologies = loadTopologies(fileName)
+        self.topologyLists = {}
 
     def __getitem__(self, item):
-        if isinstance(item, int):
-            if self.classType in type1List:
-                h, w = self.lookup[item]
-                array = self.X[item, 0:h]
-                return arrayToData(array, self.classType)
-            elif self.classType in type2List:
-                h, w = self.lookup[item]
-                array = self.X[item, 0:h, 0:w]
-                return arrayToData(array, self.classType)
-            elif self.classType == "MATRIX":
-                h, w, c = self.lookup[item]
-                array = self.X[item, 0:h, 0:w, 0:c]
-                return arrayToData(array, self.classType)
+        if isinstance(item, (int, np.integer)):
+            return self.buildMesh(item, self.read(item))
         else:
             raise ValueError("Cannot get ", item)
+
+    def getTopology(self, i):
+        topologyId = int(self.topologyIds[i]) if i < len(self.topologyIds) else -1
+        if topologyId < 0:
+            return EdgeIndicesList(), PolygonIndicesList()
+        lists = self.topologyLists.get(topologyId)
+        if lists is None:
+            edges, indices, polyStarts, polyLengths = self.topologies[topologyId]
+            lists = (EdgeIndicesList.fromNumpyArray(edges),
+                     PolygonIndicesList(indices=UIntegerList.fromNumpyArray(indices),
+                                        polyStarts=UIntegerList.fromNumpyArray(polyStarts),
+                                        polyLengths=UIntegerList.fromNumpyArray(polyLengths)))
+            self.topologyLists[topologyId] = lists
+        return lists
+
+    def buildMesh(self, i, vertices):
+        edges, polygons = self.getTopology(i)
+        return Mesh(arrayToData(vertices, "VECTOR"), edges, polygons, skipValidation=True)
+
+    def accumulate(self, i):
+        raise ValueError("Mesh caches can't be accumulated")
+
+    def interpolate(self, i, t):
+        if t <= 0 or i + 1 >= self.n or self.topologyIds[i] != self.topologyIds[i + 1]:
+            return self[i + 1 if t >= 0.5 and i + 1 < self.n else i]
+        return self.buildMesh(i, interpolateFrames(self.read(i), self.read(i + 1), t, "VECTOR"))
+
+class ShardedReader(Reader):
+    '''
+    Reads a sharded cache, shards are opened through the reader pool
+    when one of their frames is requested. Frames of missing shards are empty.
+    Shards are read while the pool is locked, so the prefetch thread never
+    reads a shard that is being closed.
+    '''
+    def __init__(self, fileName):
+        assert isfile(fileName)
+        fileName, lookupFile, metaFile = getCacheFiles(fileName)
+        meta = readMeta(metaFile)
+
+        self.fileName = fileName
+        self.shardSize = meta['shard_size']
+        self.shardFiles = set()
+        self.layout = None
+        self.encoding = None
+        self.classType = meta['class_type']
+        self.startFrame = meta['start_frame']
+        self.endFrame = meta['end_frame']
+        self.n = meta['n']
+        self.prefetcher = None
+
+    def getShard(self, i):
+        k = i // self.shardSize
+        shardFile = getShardFile(self.fileName, k)
+        if not isfile(shardFile):
+            return None, i
+        with readerPoolLock:
+            self.shardFiles.add(shardFile)
+            return getReader(shardFile), i - k * self.shardSize
+
+    def __getitem__(self, item):
+        if self.classType != "MESH":
+            return super().__getitem__(item)
+        if isinstance(item, (int, np.integer)):
+            vertices = self.read(item)
+            shard, j = self.getShard(item)
+            return Mesh() if shard is None else shard.buildMesh(j, vertices)
+        else:
+            raise ValueError("Cannot get ", item)
+
+    def decode(self, i):
+        with readerPoolLock:
+            shard, j = self.getShard(i)
+            if shard is None:
+                return np.zeros((0, *getItemShape(self.classType)), getDtype(self.classType))
+            return shard.read(j)
+
+    def accumulate(self, i):
+        if self.classType == "MESH":
+            raise ValueError("Mesh caches can't be accumulated")
+        return arrayToData(np.concatenate([self.read(j) for j in range(i + 1)]), self.classType)
+
+    def interpolate(self, i, t):
+        if t <= 0 or i + 1 >= self.n:
+            return self[i]
+        if self.classType != "MESH":
+            return super().interpolate(i, t)
+        if i // self.shardSize == (i + 1) // self.shardSize:
+            with readerPoolLock:
+                shard, j = self.getShard(i)
+                if shard is not None:
+                    return shard.interpolate(j, t)
+        return self[i if t < 0.5 else i + 1]
+
+    def close(self):
+        self.setPrefetch(0)
+        with readerPoolLock:
+            shardFiles = list(self.shardFiles)
+            self.shardFiles.clear()
+        for shardFile in shardFiles:
+            closeReader(shardFile)
+
+def openReader(fileName):
+    fileName, lookupFile, metaFile = getCacheFiles(fileName)
+    meta = readMeta(metaFile) if isfile(metaFile) else {}
+    if meta.get('layout') == "SHARDED":
+        return ShardedReader(fileName)
+    if meta.get('layout') == "CHANNELS":
+        return ChannelReader(fileName)
+    if meta.get('class_type') == "MESH":
+        return MeshReader(fileName)
+    return Reader(fileName)
+
+# Reader Pool
+
+# Open readers keyed by absolute file path, so that consecutive frames
+# reuse one memmap and one decoded lookup table instead of reopening the cache.
+# Prefetch threads of sharded readers use the pool as well, readers are
+# replaced while the lock is held but closed after it is released, since
+# closing a reader waits for its prefetch thread.
+readerPool = {}
+readerPoolLock = RLock()
+
+def getFileSignature(fileName):
+    signature = []
+    for path in getCacheFiles(fileName):
+        fileStat = stat(path)
+        signature.append((fileStat.st_mtime_ns, fileStat.st_size))
+    # The journal of a live bake grows with every committed frame.
+    try:
+        fileStat = stat(getJournalFile(fileName))
+        signature.append((fileStat.st_mtime_ns, fileStat.st_size))
+    except FileNotFoundError:
+        pass
+    return tuple(signature)
+
+def getReader(fileName):
+    key = abspath(fileName)
+    signature = getFileSignature(key)
+    with readerPoolLock:
+        entry = readerPool.get(key)
+        if entry is not None and entry[1] == signature:
+            return entry[0]
+        reader = openReader(key)
+        readerPool[key] = (reader, signature)
+    if entry is not None:
+        entry[0].close()
+    return reader
+
+def closeReader(fileName):
+    with readerPoolLock:
+        entry = readerPool.pop(abspath(fileName), None)
+    if entry is not None:
+        entry[0].close()
+
+def closeAllReaders():
+    with readerPoolLock:
+        keys = list(readerPool.keys())
+    for key in keys:
+        closeReader(key)
+
+def unregister():
+    closeAllReaders()
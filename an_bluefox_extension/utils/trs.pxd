@@ -0,0 +1,10 @@
+from animation_nodes . math cimport Vector3, Quaternion, Matrix4
+from animation_nodes . data_structures cimport Vector3DList, QuaternionList
+
+cdef class TRSList:
+    cdef readonly Vector3DList translations
+    cdef readonly QuaternionList rotations
+    cdef readonly Vector3DList scales
+
+cdef bint decomposeMatrix(Matrix4 *m, Vector3 *t, Quaternion *q, Vector3 *s)
+cdef composeMatrix(Matrix4 *m, Vector3 *t, Quaternion *q, Vector3 *s)
@@ -0,0 +1,152 @@
+from libc.math cimport sqrt, fabs
+
+from animation_nodes . math cimport Vector3, Euler3, Quaternion, Matrix4, quaternionNormalize_InPlace
+
+from animation_nodes . data_structures cimport (
+    Vector3DList, QuaternionList, Matrix4x4List, FloatList,
+    VirtualVector3DList, VirtualEulerList, VirtualQuaternionList, VirtualFloatList
+)
+
+from . mix cimport (
+    eulerToQuaternion, rotationMatrixToQuaternion,
+    quaternionToMatrix4, vectorLerpInPlace, quaternionNlerpInPlace
+)
+from . mix import quaternionsToEulers
+
+# Matrices kept as translation, rotation and scale lists. Effex chains decompose
+# once, change the components directly and compose 4x4 matrices only at the end.
+
+cdef class TRSList:
+    def __cinit__(self, Vector3DList translations = None, QuaternionList rotations = None,
+                  Vector3DList scales = None):
+        self.translations = Vector3DList() if translations is None else translations
+        self.rotations = QuaternionList() if rotations is None else rotations
+        self.scales = Vector3DList() if scales is None else scales
+        assert self.translations.length == self.rotations.length == self.scales.length
+
+    def __len__(self):
+        return self.translations.length
+
+    def copy(self):
+        return TRSList(self.translations.copy(), self.rotations.copy(), self.scales.copy())
+
+    @staticmethod
+    def fromMatrices(Matrix4x4List matrices, bint exact = False):
+        '''Scales are positive like extractMatrixScales. Mirrored and sheared matrices
+        can't be composed again from the components, with `exact` None is returned then.'''
+        cdef Py_ssize_t i
+        cdef Py_ssize_t amount = matrices.length
+        cdef TRSList trs = TRSList(Vector3DList(length = amount),
+                                   QuaternionList(length = amount),
+                                   Vector3DList(length = amount))
+        for i in range(amount):
+            if not decomposeMatrix(matrices.data + i, trs.translations.data + i,
+                                   trs.rotations.data + i, trs.scales.data + i) and exact:
+                return None
+        return trs
+
+    def toMatrices(self):
+        cdef Py_ssize_t i
+        cdef Py_ssize_t amount = self.translations.length
+        cdef Matrix4x4List matrices = Matrix4x4List(length = amount)
+        for i in range(amount):
+            composeMatrix(matrices.data + i, self.translations.data + i,
+                          self.rotations.data + i, self.scales.data + i)
+        return matrices
+
+    def getEulers(self):
+        return quaternionsToEulers(self.rotations)
+
+cdef bint decomposeMatrix(Matrix4 *m, Vector3 *t, Quaternion *q, Vector3 *s):
+    '''Returns False when the matrix is mirrored or sheared.'''
+    cdef float sx = sqrt(m.a11 * m.a11 + m.a21 * m.a21 + m.a31 * m.a31)
+    cdef float sy = sqrt(m.a12 * m.a12 + m.a22 * m.a22 + m.a32 * m.a32)
+    cdef float sz = sqrt(m.a13 * m.a13 + m.a23 * m.a23 + m.a33 * m.a33)
+
+    t.x, t.y, t.z = m.a14, m.a24, m.a34
+    s.x, s.y, s.z = sx, sy, sz
+
+    if sx == 0: sx = 1
+    if sy == 0: sy = 1
+    if sz == 0: sz = 1
+    cdef Matrix4 r
+    r.a11, r.a21, r.a31 = m.a11 / sx, m.a21 / sx, m.a31 / sx
+    r.a12, r.a22, r.a32 = m.a12 / sy, m.a22 / sy, m.a32 / sy
+    r.a13, r.a23, r.a33 = m.a13 / sz, m.a23 / sz, m.a33 / sz
+
+    cdef float det = (r.a11 * (r.a22 * r.a33 - r.a23 * r.a32)
+                    - r.a12 * (r.a21 * r.a33 - r.a23 * r.a31)
+                    + r.a13 * (r.a21 * r.a32 - r.a22 * r.a31))
+    cdef bint exact = det >= 0 and (
+        fabs(r.a11 * r.a12 + r.a21 * r.a22 + r.a31 * r.a32) < 1e-4 and
+        fabs(r.a11 * r.a13 + r.a21 * r.a23 + r.a31 * r.a33) < 1e-4 and
+        fabs(r.a12 * r.a13 + r.a22 * r.a23 + r.a32 * r.a33) < 1e-4)
+
+    rotationMatrixToQuaternion(q, &r)
+    return exact
+
+cdef composeMatrix(Matrix4 *m, Vector3 *t, Quaternion *q, Vector3 *s):
+    quaternionToMatrix4(m, q)
+    m.a11 *= s.x; m.a21 *= s.x; m.a31 *= s.x
+    m.a12 *= s.y; m.a22 *= s.y; m.a32 *= s.y
+    m.a13 *= s.z; m.a23 *= s.z; m.a33 *= s.z
+    m.a14, m.a24, m.a34 = t.x, t.y, t.z
+
+cdef multiplyQuaternion(Quaternion *target, Quaternion *a, Quaternion *b):
+    cdef float w = a.w * b.w - a.x * b.x - a.y * b.y - a.z * b.z
+    cdef float x = a.w * b.x + a.x * b.w + a.y * b.z - a.z * b.y
+    cdef float y = a.w * b.y - a.x * b.z + a.y * b.w + a.z * b.x
+    cdef float z = a.w * b.z + a.x * b.y - a.y * b.x + a.z * b.w
+    target.w, target.x, target.y, target.z = w, x, y, z
+
+def offsetTRSList(TRSList trs, FloatList influences,
+                  VirtualVector3DList translations, VirtualEulerList rotations,
+                  VirtualVector3DList scales, bint useTranslation, bint useRotation, bint useScale):
+    '''Same result as scaling on local axes, rotating around global axes with local pivots
+    and translating along global axes, the components are changed in place.'''
+    cdef Py_ssize_t i
+    cdef float f
+    cdef Vector3 *v
+    cdef Euler3 *e
+    cdef Euler3 euler
+    cdef Quaternion delta
+
+    for i in range(trs.translations.length):
+        f = influences.data[i]
+        if useScale:
+            v = scales.get(i)
+            trs.scales.data[i].x *= 1 + (v.x - 1) * f
+            trs.scales.data[i].y *= 1 + (v.y - 1) * f
+            trs.scales.data[i].z *= 1 + (v.z - 1) * f
+        if useRotation:
+            e = rotations.get(i)
+            euler.x, euler.y, euler.z, euler.order = e.x * f, e.y * f, e.z * f, e.order
+            eulerToQuaternion(&delta, &euler)
+            multiplyQuaternion(trs.rotations.data + i, &delta, trs.rotations.data + i)
+            quaternionNormalize_InPlace(trs.rotations.data + i)
+        if useTranslation:
+            v = translations.get(i)
+            trs.translations.data[i].x += v.x * f
+            trs.translations.data[i].y += v.y * f
+            trs.translations.data[i].z += v.z * f
+    return trs
+
+def lerpTRSLists(TRSList a, TRSList b, FloatList factors):
+    cdef Py_ssize_t i
+    cdef Py_ssize_t amount = max(max(len(a), len(b)), factors.length)
+    cdef TRSList result = TRSList(Vector3DList(length = amount),
+                                  QuaternionList(length = amount),
+                                  Vector3DList(length = amount))
+    cdef VirtualFloatList _factors = VirtualFloatList.create(factors, 0)
+    cdef VirtualVector3DList tA = VirtualVector3DList.create(a.translations, (0, 0, 0))
+    cdef VirtualVector3DList tB = VirtualVector3DList.create(b.translations, (0, 0, 0))
+    cdef VirtualQuaternionList qA = VirtualQuaternionList.create(a.rotations, (1, 0, 0, 0))
+    cdef VirtualQuaternionList qB = VirtualQuaternionList.create(b.rotations, (1, 0, 0, 0))
+    cdef VirtualVector3DList sA = VirtualVector3DList.create(a.scales, (0, 0, 0))
+    cdef VirtualVector3DList sB = VirtualVector3DList.create(b.scales, (0, 0, 0))
+
+    for i in range(amount):
+        vectorLerpInPlace(result.translations.data + i, tA.get(i), tB.get(i), _factors.get(i))
+        quaternionNlerpInPlace(result.rotations.data + i, qA.get(i), qB.get(i), _factors.get(i))
+        vectorLerpInPlace(result.scales.data + i, sA.get(i), sB.get(i), _factors.get(i))
+    return result
@@ -0,0 +1,46 @@
+'''
+Timings of the Inheritance Effex spline kernels for growing point and sample counts.
+Run inside Blender with Animation Nodes and this extension enabled:
+
+    blender -b --python benchmarks/inherit_over_spline.py
+
+The time per point should stay flat when only the sample count grows.
+'''
+import numpy as np
+from time import perf_counter
+from animation_nodes . data_structures import Vector3DList, QuaternionList, FloatList
+from an_bluefox_extension . nodes . matrix . effex . c_utils import inheritPointsOverSpline, alignOnSpline
+
+def randomVectors(amount, rng):
+    return Vector3DList.fromNumpyArray(rng.random(amount * 3).astype('float32'))
+
+def randomQuaternions(amount, rng):
+    q = rng.normal(size = (amount, 4)).astype('float32')
+    q /= np.linalg.norm(q, axis = 1)[:, None]
+    return QuaternionList.fromNumpyArray(q.ravel())
+
+def timeIt(function, *args, repeat = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        function(*args)
+        best = min(best, perf_counter() - start)
+    return best
+
+def run(pointCounts = (1000, 10000, 100000), sampleCounts = (10, 200, 2000)):
+    rng = np.random.default_rng(0)
+    print(f"{'points':>8} {'samples':>8} {'points ms':>10} {'align ms':>10} {'ns/point':>9}")
+    for points in pointCounts:
+        vA, vB = randomVectors(points, rng), randomVectors(points, rng)
+        qA, qB = randomQuaternions(points, rng), randomQuaternions(points, rng)
+        influences = FloatList.fromNumpyArray(rng.random(points).astype('float32'))
+        for samples in sampleCounts:
+            splinePoints = randomVectors(samples, rng)
+            splineRotations = randomQuaternions(samples, rng)
+            pointTime = timeIt(inheritPointsOverSpline, vA, vB, splinePoints, influences)
+            alignTime = timeIt(alignOnSpline, qA, qB, splineRotations, influences)
+            print(f"{points:>8} {samples:>8} {pointTime * 1000:>10.2f} {alignTime * 1000:>10.2f} "
+                  f"{pointTime / points * 1e9:>9.1f}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,6 @@
+import sys
+from os.path import abspath, dirname, join
+
+# Like cache_repack.py, the utils folder is imported as a package, so the
+# disk cache modules can be tested without Blender.
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), "an_bluefox_extension"))
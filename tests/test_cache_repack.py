@@ -0,0 +1,56 @@
+import pytest
+np = pytest.importorskip("numpy")
+
+from utils import save_to_disk as sd
+from utils import cache_repack
+
+def frameData(i):
+    return np.arange((i % 5 + 1) * 3, dtype = 'float32').reshape(-1, 3) + i * 100
+
+def writeCache(path, frames, layout = "RAGGED"):
+    info = {'n': 30, 'max_length': 8, 'start_frame': 1, 'end_frame': 30,
+            'class_type': "VECTOR", 'layout': layout, 'chunk_size': 4}
+    with sd.openWriter(str(path), info) as writer:
+        for i in frames:
+            writer.insertSnapshot(i, frameData(i))
+
+def readCache(path):
+    reader = sd.openReader(str(path))
+    try:
+        return [np.array(reader.read(i)) for i in range(reader.n)]
+    finally:
+        reader.close()
+
+@pytest.mark.parametrize("layout", ["PADDED", "RAGGED", "COMPRESSED"])
+@pytest.mark.parametrize("encoding", ["NONE", "FLOAT16", "QUANTIZED", "DELTA"])
+def test_cli_repacks_every_frame(tmp_path, capsys, layout, encoding):
+    source, target = tmp_path / "source.npy", tmp_path / "target.npy"
+    writeCache(source, range(30))
+    cache_repack.main([str(source), str(target), "--layout", layout, "--encoding", encoding,
+                       "--chunk-size", "4", "--keyframe-interval", "4"])
+    assert "Frames:     30" in capsys.readouterr().out
+
+    meta = sd.readMeta(sd.getCacheFiles(str(target))[2])
+    assert (meta['layout'], meta['encoding'], meta['start_frame'], meta['end_frame']) == (layout, encoding, 1, 30)
+    frames = readCache(target)
+    for i in range(30):
+        expected = frameData(i)
+        assert frames[i].shape == expected.shape
+        assert np.allclose(frames[i], expected, rtol = 1e-3, atol = 1e-2)
+
+def test_cli_fails_for_the_same_cache(tmp_path, capsys):
+    source = tmp_path / "source.npy"
+    writeCache(source, range(30))
+    with pytest.raises(SystemExit) as exit:
+        cache_repack.main([str(source), str(source)])
+    assert exit.value.code == 1
+    assert "Repacking failed" in capsys.readouterr().err
+
+def test_repack_keeps_unwritten_frames(tmp_path):
+    source, target = tmp_path / "source.npy", tmp_path / "target.npy"
+    writeCache(source, range(10, 21))
+    cache_repack.repack(str(source), str(target), layout = "COMPRESSED", report = lambda text: None)
+
+    info = {'n': 30, 'start_frame': 1, 'class_type': "VECTOR", 'mode': "APPEND"}
+    with sd.openWriter(str(target), info) as writer:
+        assert [writer.isFilled(i) for i in range(30)] == [10 <= i <= 20 for i in range(30)]
@@ -0,0 +1,91 @@
+'''
+The fade memory ring doesn't depend on Animation Nodes, the module is built
+with pyximport so these tests also run outside of Blender.
+'''
+import os
+import sys
+import shutil
+import pytest
+np = pytest.importorskip("numpy")
+pyximport = pytest.importorskip("pyximport")
+
+falloffDirectory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "an_bluefox_extension", "nodes", "falloff")
+
+@pytest.fixture(scope = "module")
+def fade_memory(tmp_path_factory):
+    # The module is built outside of the package, pyximport looks for
+    # top level modules in the working directory.
+    sourceDirectory = tmp_path_factory.mktemp("fade_memory")
+    for extension in (".pyx", ".pxd"):
+        shutil.copy(os.path.join(falloffDirectory, "fade_memory" + extension), sourceDirectory)
+    importers = pyximport.install(build_dir = str(sourceDirectory / "build"),
+                                  language_level = 3, inplace = False)
+    workingDirectory = os.getcwd()
+    os.chdir(sourceDirectory)
+    try:
+        import fade_memory
+    finally:
+        os.chdir(workingDirectory)
+        pyximport.uninstall(*importers)
+    yield fade_memory
+    sys.modules.pop("fade_memory", None)
+
+def values(*args):
+    return np.array(args, dtype = 'float32')
+
+def push(memory, frame, *args):
+    memory.pushValues(values(*args), frame)
+
+def mix(memory, current, fadeMin, fadeMax, pushed):
+    target = np.zeros(len(current), dtype = 'float32')
+    memory.mixValues(values(*current), target, fadeMin, fadeMax, pushed)
+    return target
+
+def test_rows_are_weighted_from_newest_to_oldest(fade_memory):
+    memory = fade_memory.FadeMemory(3, True)
+    push(memory, 1, 1, 0)
+    push(memory, 2, 0, 1)
+    push(memory, 3, 0.5, 0.5)
+    # Weights are 1, 0.6 and 0.2 for the ages 0, 1 and 2.
+    assert np.allclose(mix(memory, (0.5, 0.5), 0.2, 1, True), (0.5, 0.6))
+
+def test_ring_wraps_around(fade_memory):
+    memory = fade_memory.FadeMemory(2, True)
+    push(memory, 1, 1, 0)
+    push(memory, 2, 0, 0)
+    assert np.allclose(mix(memory, (0, 0), 1, 1, True), (1, 0))
+    push(memory, 3, 0, 0)
+    assert memory.head == 1
+    assert np.allclose(mix(memory, (0, 0), 1, 1, True), (0, 0))
+
+def test_same_frame_replaces_newest_row(fade_memory):
+    memory = fade_memory.FadeMemory(2, True)
+    push(memory, 1, 1, 0)
+    push(memory, 2, 0, 0)
+    head = memory.head
+    push(memory, 2, 0, 1)
+    assert memory.head == head
+    assert np.allclose(mix(memory, (0, 1), 1, 1, True), (1, 1))
+
+def test_without_push_stored_rows_are_one_frame_older(fade_memory):
+    frames = [(1, 0, 0), (0, 1, 0), (0, 0, 1), (0.5, 0, 0.5)]
+    current = (0.2, 0.2, 0.2)
+    for useMax in (True, False):
+        recorded = fade_memory.FadeMemory(4, useMax)
+        replayed = fade_memory.FadeMemory(4, useMax)
+        for frame, strengths in enumerate(frames):
+            push(recorded, frame, *strengths)
+            push(replayed, frame, *strengths)
+        push(recorded, len(frames), *current)
+        assert np.allclose(mix(replayed, current, 0.1, 0.9, False),
+                           mix(recorded, current, 0.1, 0.9, True))
+
+def test_other_amount_starts_a_new_memory(fade_memory):
+    memory = fade_memory.FadeMemory(3, False)
+    push(memory, 1, 0, 0)
+    # Nothing is stored for three points yet, only the current strengths are used.
+    assert np.allclose(mix(memory, (0.5, 0.5, 0.5), 0, 0.8, False), (0.4, 0.4, 0.4))
+    push(memory, 2, 0.5, 0.5, 0.5)
+    # MIN starts with full strengths in the other rows.
+    assert np.allclose(mix(memory, (0.5, 0.5, 0.5), 0, 0.8, True), (0, 0, 0))
@@ -0,0 +1,247 @@
+import pytest
+from time import sleep
+np = pytest.importorskip("numpy")
+
+from utils import save_to_disk as sd
+
+layouts = ["PADDED", "RAGGED", "COMPRESSED"]
+encodings = ["NONE", "FLOAT16", "QUANTIZED", "DELTA"]
+
+def frameData(i, length = None):
+    length = i % 5 + 1 if length is None else length
+    return (np.arange(length * 3, dtype = 'float32').reshape(-1, 3) + i * 100)
+
+def openWriter(path, layout, mode = "WRITE", n = 30, **info):
+    info = dict({'n': n, 'max_length': 8, 'start_frame': 0, 'end_frame': n - 1,
+                 'class_type': "VECTOR", 'layout': layout, 'chunk_size': 4, 'mode': mode}, **info)
+    return sd.openWriter(str(path), info)
+
+def assertFrame(frame, expected, encoding = "NONE"):
+    # Float16 keeps about three significant digits, quantized frames are exact up to 1/65535 of their range.
+    assert frame.shape == expected.shape
+    if encoding == "NONE":
+        assert np.array_equal(frame, expected)
+    else:
+        assert np.allclose(frame, expected, rtol = 1e-3, atol = 1e-2)
+
+def readAll(path):
+    reader = sd.openReader(str(path))
+    try:
+        return [np.array(reader.read(i)) for i in range(reader.n)]
+    finally:
+        reader.close()
+
+@pytest.mark.parametrize("layout", layouts)
+def test_skipped_frames_are_not_filled(tmp_path, layout):
+    path = tmp_path / "cache.npy"
+    with openWriter(path, layout) as writer:
+        for i in range(10, 21):
+            writer.insertSnapshot(i, frameData(i))
+        assert not any(writer.isFilled(i) for i in range(10))
+
+    with openWriter(path, layout, "APPEND") as writer:
+        assert [writer.isFilled(i) for i in range(30)] == [10 <= i <= 20 for i in range(30)]
+
+@pytest.mark.parametrize("layout", layouts)
+def test_gaps_are_written_later(tmp_path, layout):
+    path = tmp_path / "cache.npy"
+    with openWriter(path, layout) as writer:
+        for i in (4, 5, 12, 13, 14):
+            writer.insertSnapshot(i, frameData(i))
+
+    with openWriter(path, layout, "APPEND") as writer:
+        for i in range(30):
+            if not writer.isFilled(i):
+                writer.insertSnapshot(i, frameData(i))
+        assert all(writer.isFilled(i) for i in range(30))
+
+    frames = readAll(path)
+    for i in range(30):
+        assert np.array_equal(frames[i], frameData(i))
+
+@pytest.mark.parametrize("layout", layouts)
+def test_writing_part_of_a_gap_keeps_the_other_frames(tmp_path, layout):
+    path = tmp_path / "cache.npy"
+    with openWriter(path, layout) as writer:
+        for i in range(10, 21):
+            writer.insertSnapshot(i, frameData(i))
+    with openWriter(path, layout, "APPEND") as writer:
+        for i in range(5, 8):
+            writer.insertSnapshot(i, frameData(i))
+
+    frames = readAll(path)
+    for i in range(30):
+        expected = frameData(i) if 5 <= i < 8 or 10 <= i <= 20 else np.zeros((0, 3), 'float32')
+        assert np.array_equal(frames[i], expected)
+
+def bakeFrames(writer, frames):
+    # Like the bake operator, filled frames and frames of other processes are skipped.
+    written = []
+    for i in frames:
+        if writer.isFilled(i) or writer.isLocked(i):
+            continue
+        writer.insertSnapshot(i, frameData(i))
+        written.append(i)
+    return written
+
+@pytest.mark.parametrize("layout, info", [(layout, {}) for layout in layouts] +
+                         [("RAGGED", {'shard_size': 8}), ("COMPRESSED", {'encoding': "DELTA", 'keyframe_interval': 4})])
+def test_resume_writes_only_missing_frames(tmp_path, layout, info):
+    path = tmp_path / "cache.npy"
+    with openWriter(path, layout, "APPEND", **info) as writer:
+        assert bakeFrames(writer, range(10, 21)) == list(range(10, 21))
+    with openWriter(path, layout, "APPEND", **info) as writer:
+        assert bakeFrames(writer, range(0, 30)) == list(range(0, 10)) + list(range(21, 30))
+        assert all(writer.isFilled(i) for i in range(30))
+
+    frames = readAll(path)
+    for i in range(30):
+        assert np.allclose(frames[i], frameData(i), atol = 1e-2)
+
+def test_frames_of_locked_shards_are_not_filled(tmp_path):
+    path = tmp_path / "cache.npy"
+    first = openWriter(path, "RAGGED", "APPEND", shard_size = 8)
+    second = openWriter(path, "RAGGED", "APPEND", shard_size = 8)
+    try:
+        assert bakeFrames(first, range(0, 4)) == list(range(0, 4))
+        assert not second.isFilled(0) and second.isLocked(0)
+        assert bakeFrames(second, range(0, 12)) == list(range(8, 12))
+    finally:
+        first.flush()
+        second.flush()
+
+class ListData:
+    # Stands in for an Animation Nodes list.
+    def __init__(self, array):
+        self.array = array
+
+    def asNumpyArray(self):
+        return self.array.reshape(-1)
+
+def test_async_writer_reads_the_layout_between_inserts(tmp_path):
+    writer = openWriter(tmp_path / "cache.npy", "RAGGED")
+    inserting = []
+    insertSnapshot, isFilled = writer.insertSnapshot, writer.isFilled
+
+    def slowInsert(i, snapshot):
+        inserting.append(i)
+        sleep(0.002)
+        insertSnapshot(i, snapshot)
+        inserting.remove(i)
+
+    def checkedIsFilled(i):
+        assert not inserting
+        return isFilled(i)
+
+    writer.insertSnapshot, writer.isFilled = slowInsert, checkedIsFilled
+    with sd.AsyncWriter(writer) as asyncWriter:
+        # Writing backwards fills gaps, so the later frames are moved aside on every insert.
+        for i in reversed(range(30)):
+            asyncWriter.write(i, ListData(frameData(i)))
+            for j in range(i, 30):
+                asyncWriter.isFilled(j)
+
+    frames = readAll(tmp_path / "cache.npy")
+    for i in range(30):
+        assert np.array_equal(frames[i], frameData(i))
+
+@pytest.mark.parametrize("layout", layouts)
+@pytest.mark.parametrize("encoding", encodings)
+def test_live_frames_are_readable_after_their_chunk(tmp_path, layout, encoding):
+    path = tmp_path / "cache.npy"
+    with openWriter(path, layout, live = True, encoding = encoding, keyframe_interval = 3) as writer:
+        for i in range(12):
+            writer.insertSnapshot(i, frameData(i, 8))
+            # Padded and ragged frames are visible right away, compressed ones once their chunk is complete.
+            visible = i + 1 if layout != "COMPRESSED" else (i + 1) - (i + 1) % 4
+            reader = sd.Reader(str(path))
+            try:
+                assert [bool(reader.layout.isFilled(j)) for j in range(12)] == [j < visible for j in range(12)]
+                for j in range(visible):
+                    assertFrame(reader.read(j), frameData(j, 8), encoding)
+            finally:
+                reader.close()
+
+@pytest.mark.parametrize("layout", layouts)
+@pytest.mark.parametrize("encoding", ["NONE", "FLOAT16", "QUANTIZED"])
+def test_bytes_written_match_the_file(tmp_path, layout, encoding):
+    path = tmp_path / "cache.npy"
+    writer = openWriter(path, layout, encoding = encoding)
+    for i in range(30):
+        writer.insertSnapshot(i, frameData(i))
+    writer.flush()
+
+    if layout == "PADDED":
+        # Padded files are allocated up front, only the rows of the frames are written.
+        rows = sum(len(frameData(i)) + writer.encoding.headerRows for i in range(30))
+        stored = {"NONE": 4, "FLOAT16": 2, "QUANTIZED": 2}[encoding]
+        assert writer.bytesWritten == rows * 3 * stored
+    else:
+        assert writer.bytesWritten == path.stat().st_size
+
+@pytest.mark.parametrize("layout", layouts)
+@pytest.mark.parametrize("encoding", encodings)
+def test_round_trip(tmp_path, layout, encoding):
+    path = tmp_path / "cache.npy"
+    with openWriter(path, layout, encoding = encoding, keyframe_interval = 4) as writer:
+        for i in range(30):
+            writer.insertSnapshot(i, frameData(i))
+
+    frames = readAll(path)
+    for i in range(30):
+        assertFrame(frames[i], frameData(i), encoding)
+
+    reader = sd.Reader(str(path))
+    try:
+        for step in (1, 2):
+            block, lengths = reader.readRange(3, 17, step)
+            assert list(lengths) == [len(frameData(i)) for i in range(3, 17, step)]
+            for k, i in enumerate(range(3, 17, step)):
+                assertFrame(block[k, 0:lengths[k]], frameData(i), encoding)
+    finally:
+        reader.close()
+
+def test_delta_invalidation_ends_at_a_key_frame():
+    encoding = sd.getEncoding({'encoding': "DELTA", 'keyframe_interval': 4})
+    assert [encoding.getInvalidationEnd(stop) for stop in (5, 7, 8, 9)] == [8, 8, 8, 12]
+    assert sd.getEncoding({'encoding': "QUANTIZED"}).getInvalidationEnd(5) == 5
+
+@pytest.mark.parametrize("layout", layouts)
+@pytest.mark.parametrize("encoding", encodings)
+def test_invalidated_frames_are_baked_again(tmp_path, layout, encoding):
+    path = tmp_path / "cache.npy"
+    with openWriter(path, layout, encoding = encoding, keyframe_interval = 4) as writer:
+        bakeFrames(writer, range(30))
+
+    # Delta frames up to the next key frame refer to the invalidated key frame, they are baked again as well.
+    rebaked = range(5, 8) if encoding == "DELTA" else range(5, 6)
+    with openWriter(path, layout, "APPEND", encoding = encoding, keyframe_interval = 4) as writer:
+        writer.invalidate(5, 6)
+        assert [i for i in range(30) if not writer.isFilled(i)] == list(rebaked)
+        for i in rebaked:
+            writer.insertSnapshot(i, frameData(i, 8) + 0.5)
+
+    frames = readAll(path)
+    for i in range(30):
+        assertFrame(frames[i], frameData(i, 8) + 0.5 if i in rebaked else frameData(i), encoding)
+
+def test_reader_pool_reopens_changed_caches(tmp_path):
+    path = str(tmp_path / "cache.npy")
+    with openWriter(path, "RAGGED") as writer:
+        bakeFrames(writer, range(10))
+    try:
+        reader = sd.getReader(path)
+        assert sd.getReader(path) is reader
+
+        # Writing closes the pooled reader, the next request opens the new cache.
+        with openWriter(path, "RAGGED", "APPEND") as writer:
+            writer.invalidate(3, 4)
+            writer.insertSnapshot(3, frameData(3, 8))
+        newReader = sd.getReader(path)
+        assert newReader is not reader
+        assert np.array_equal(newReader.read(3), frameData(3, 8))
+
+        sd.closeReader(path)
+        assert sd.getReader(path) is not newReader
+    finally:
+        sd.closeAllReaders()
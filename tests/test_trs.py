@@ -0,0 +1,83 @@
+'''
+Needs the compiled extension and Animation Nodes, run inside Blender:
+
+    blender -b --python-expr "import pytest; pytest.main(['tests'])"
+'''
+import pytest
+np = pytest.importorskip("numpy")
+pytest.importorskip("animation_nodes")
+trs = pytest.importorskip("an_bluefox_extension.utils.trs")
+mix = pytest.importorskip("an_bluefox_extension.utils.mix")
+effex = pytest.importorskip("an_bluefox_extension.nodes.matrix.effex.c_utils")
+
+from mathutils import Euler
+from animation_nodes . data_structures import (
+    Matrix4x4List, EulerList, FloatList, VirtualVector3DList, VirtualEulerList
+)
+from animation_nodes . nodes . matrix . c_utils import extractMatrixScales
+
+def matrixList(*matrices):
+    return Matrix4x4List.fromNumpyArray(np.array([np.asarray(m, 'float32').T for m in matrices]).ravel())
+
+def test_mirrored_matrices_are_not_decomposed_exactly():
+    mirrored = np.diag([-2, 3, 4, 1])
+    mirrored[0:3, 3] = (1, 2, 3)
+    matrices = matrixList(np.eye(4), mirrored)
+
+    assert trs.TRSList.fromMatrices(matrices, exact = True) is None
+
+    # Scales keep the sign convention of extractMatrixScales.
+    components = trs.TRSList.fromMatrices(matrices)
+    assert np.allclose(components.scales.asNumpyArray(), extractMatrixScales(matrices).asNumpyArray())
+    assert np.allclose(components.scales.asNumpyArray().reshape(-1, 3)[1], (2, 3, 4))
+    assert np.allclose(components.translations.asNumpyArray().reshape(-1, 3)[1], (1, 2, 3))
+
+def test_sheared_matrices_are_not_decomposed_exactly():
+    sheared = np.eye(4)
+    sheared[0, 1] = 0.5
+    assert trs.TRSList.fromMatrices(matrixList(sheared), exact = True) is None
+
+def test_rotation_and_scale_round_trip():
+    angle = 0.7
+    m = np.eye(4)
+    m[0:2, 0:2] = ((np.cos(angle), -np.sin(angle)), (np.sin(angle), np.cos(angle)))
+    m[0:3, 0:3] *= (1, 2, 3)
+    m[0:3, 3] = (4, 5, 6)
+    matrices = matrixList(m)
+    components = trs.TRSList.fromMatrices(matrices, exact = True)
+    assert components is not None
+    assert np.allclose(components.toMatrices().asNumpyArray(), matrices.asNumpyArray(), atol = 1e-5)
+
+eulerOrders = ("XYZ", "XZY", "YXZ", "YZX", "ZXY", "ZYX")
+
+def sameRotation(a, b):
+    # q and -q are the same rotation.
+    a, b = np.asarray(a).reshape(-1, 4), np.asarray(b).reshape(-1, 4)
+    return np.allclose(np.abs(np.sum(a * b, axis = 1)), 1, atol = 1e-5)
+
+@pytest.mark.parametrize("order", eulerOrders)
+def test_eulers_to_quaternions_respects_order(order):
+    eulers = [Euler((0.5, 0, 0), order), Euler((0, -1.2, 0), order),
+              Euler((0, 0, 2.5), order), Euler((0.3, -2.1, 1.4), order)]
+    quaternions = mix.eulersToQuaternions(EulerList.fromValues(eulers))
+    expected = [tuple(e.to_quaternion()) for e in eulers]
+    assert sameRotation(quaternions.asNumpyArray(), expected)
+
+@pytest.mark.parametrize("order", eulerOrders)
+def test_offset_trs_list_matches_offset_matrices(order):
+    angle = 0.7
+    m = np.eye(4)
+    m[0:2, 0:2] = ((np.cos(angle), -np.sin(angle)), (np.sin(angle), np.cos(angle)))
+    m[0:3, 0:3] *= (1, 2, 3)
+    m[0:3, 3] = (4, 5, 6)
+    matrices = matrixList(np.eye(4), m)
+    influences = FloatList.fromValues([1, 0.4])
+    translations = VirtualVector3DList.create((1, -2, 3), (0, 0, 0))
+    rotations = VirtualEulerList.create(Euler((0.3, -1.1, 2.2), order), (0, 0, 0))
+    scales = VirtualVector3DList.create((2, 0.5, 1.5), (1, 1, 1))
+
+    components = trs.offsetTRSList(trs.TRSList.fromMatrices(matrices, exact = True), influences,
+                                   translations, rotations, scales, True, True, True)
+    expected = effex.offsetMatrices(matrices.copy(), influences,
+                                    translations, rotations, scales, True, True, True)
+    assert np.allclose(components.toMatrices().asNumpyArray(), expected.asNumpyArray(), atol = 1e-5)